@@ -0,0 +1,125 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_WAIT_SECONDS
+
+
+class Overloaded(Exception):
+    """No admission slot became free; the caller should answer 503 with `retry_after`."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds how many chat requests run at once, with a short FIFO wait queue.
+
+    Up to `max_concurrent` requests hold a slot; up to `max_queue` more wait at most `max_wait`
+    seconds for one. Anything beyond that fails fast with `Overloaded` instead of piling up on
+    the threadpool. A released slot is handed straight to the oldest waiter. Waiters may live
+    on different event loops (e.g. several test clients), so they are woken thread-safely.
+    """
+
+    def __init__(self, max_concurrent: int = 8, max_queue: int = 16, max_wait: float = 5.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._publish()
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds a rejected client should back off: roughly one full queue wait."""
+        return max(1, math.ceil(self.max_wait))
+
+    def _publish(self) -> None:
+        ADMISSION_ACTIVE.set(self.active)
+        ADMISSION_QUEUED.set(len(self._waiters))
+
+    async def acquire(self) -> None:
+        with self._lock:
+            if self.active < self.max_concurrent and not self._waiters:
+                self.active += 1
+                self.admitted += 1
+                self._publish()
+                ADMISSION_WAIT_SECONDS.observe(0.0, outcome="admitted")
+                return
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                ADMISSION_WAIT_SECONDS.observe(0.0, outcome="queue_full")
+                raise Overloaded("queue full", self.retry_after)
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._publish()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait)
+        except BaseException as e:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    self._publish()
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on.
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                with self._lock:
+                    self.timeouts += 1
+                ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, outcome="timeout")
+                raise Overloaded("queue timeout", self.retry_after) from None
+            raise
+        with self._lock:
+            self.admitted += 1
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, outcome="admitted")
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                self._publish()
+                waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+                return
+            self.active -= 1
+            self._publish()
+
+    def _hand_over(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            return {
+                "active": self.active,
+                "queued": len(self._waiters),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "max_wait": self.max_wait,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
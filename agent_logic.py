@@ -1,113 +1,137 @@
+import asyncio
+import contextvars
 import os
 import json
-import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 from pathlib import Path
-from typing import Any
+from string import Template
+from typing import Any, AsyncIterator
 
 from dotenv import load_dotenv
-from openai import OpenAI
-import requests
+
+from history import HistoryManager, count_tokens, load_encoding, message_tokens
+from intent_router import CANNED_REPLIES, IntentRouter, Route
+from metrics import (
+    CHAT_COALESCED, CHAT_ITERATIONS, CHAT_SECONDS, COMPLETION_SECONDS, INTENT_ROUTED, TOKEN_BUDGET_ACTIONS, TOOL_SECONDS,
+    Trace, record_tokens, span, trace,
+)
+from model_router import ModelRouter
+from notifier import RESEND_URL, SENDGRID_URL, Notifier
+from outbox import Outbox, OutboxWorker
+from personas import PROMPT_TEMPLATE_NAME
+from response_cache import ResponseCache, history_hash, normalize_message
+from retrieval import RetrievalIndex
+from singleflight import SingleFlight
+from token_budget import BudgetExceeded, TokenBudget, current_client
+from upstream_pool import UpstreamPool
 
 # Load environment variables
 load_dotenv(override=True)
 
 BASE_DIR = Path(__file__).parent / "me"
+# Read first, in this order; any other .txt files in the context directory follow alphabetically.
+BIO_FILES = ("summary.txt", "linkedin.txt", "portfolio.txt")
+
+DATA_DIR = Path(__file__).parent / "data"
+OUTBOX_PATH = Path(os.getenv("OUTBOX_PATH", DATA_DIR / "outbox.sqlite3"))
+# Set RESPONSE_CACHE_PATH to an empty string to keep the reply cache in memory only.
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", str(DATA_DIR / "response_cache.sqlite3"))
+RETRIEVAL_INDEX_PATH = Path(os.getenv("RETRIEVAL_INDEX_PATH", DATA_DIR / "retrieval_index.json"))
+
+# Point OPENROUTER_BASE_URL at any OpenAI-compatible server (e.g. a local stub for load tests).
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+MODEL_NAME = "openai/gpt-4o-mini"
+# Ordered fallback chain, e.g. "openai/gpt-4o-mini,google/gemini-2.5-flash".
+MODEL_CHAIN = [m.strip() for m in os.getenv("MODEL_CHAIN", MODEL_NAME).split(",") if m.strip()]
+MAX_ITER = 5
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", 10))
+# Digest mode: with a window > 0, notifications are gathered and sent as one summary email.
+NOTIFY_DIGEST_WINDOW = float(os.getenv("NOTIFY_DIGEST_WINDOW", 0))
+NOTIFY_DIGEST_MAX_ITEMS = int(os.getenv("NOTIFY_DIGEST_MAX_ITEMS", 20))
+# Rolling token budgets per client IP and for the whole service; set either to "" to disable it.
+TOKEN_BUDGET = TokenBudget(
+    os.getenv("TOKEN_BUDGET_STORAGE_URI", f"sqlite:///{(DATA_DIR / 'token_budget.sqlite3').as_posix()}"),
+    per_client=os.getenv("TOKEN_BUDGET_PER_CLIENT", "20000/minute;150000/day"),
+    overall=os.getenv("TOKEN_BUDGET_GLOBAL", "200000/minute;2000000/day"),
+)
+
+# Token counts are estimated locally (the supported default). TOKEN_COUNTER=tiktoken counts them
+# exactly when tiktoken is installed; its BPE data is loaded here, at start-up, from
+# TIKTOKEN_CACHE_DIR or downloaded once, and never on a chat request.
+if os.getenv("TOKEN_COUNTER", "estimate") == "tiktoken":
+    load_encoding()
+
+
+def record_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Records a completion's reported usage in the metrics and charges it to the current client's budget."""
+    record_tokens(model, prompt_tokens, completion_tokens)
+    TOKEN_BUDGET.charge(current_client(), prompt_tokens + completion_tokens)
 
 
 # --- 1. Email Notifications & Tools ---
 
+NOTIFIER = Notifier(
+    resend_url=os.getenv("RESEND_URL", RESEND_URL),
+    sendgrid_url=os.getenv("SENDGRID_URL", SENDGRID_URL),
+    smtp_host=os.getenv("SMTP_HOST", "smtp.gmail.com"),
+    smtp_port=int(os.getenv("SMTP_PORT", 465)),
+    smtp_ssl=os.getenv("SMTP_SSL", "1") != "0",
+)
+
+
 def send_email(subject: str, body: str) -> bool:
     """Send email via Resend/SendGrid API (preferred for Render) or SMTP (local fallback)."""
-    recipient_email = os.getenv("RECIPIENT_EMAIL", "").strip()
-    smtp_email = os.getenv("SMTP_EMAIL", "").strip()
-    smtp_password = os.getenv("SMTP_PASSWORD", "").strip()
-    from_email = os.getenv("SENDGRID_VERIFIED_SENDER", "").strip() or smtp_email or "no-reply@portfolio.com"
-
-    # METHOD 1: Resend API
-    resend_key = os.getenv("RESEND_API_KEY", "").strip()
-    if resend_key:
-        try:
-            response = requests.post(
-                "https://api.resend.com/emails",
-                headers={"Authorization": f"Bearer {resend_key}", "Content-Type": "application/json"},
-                json={
-                    "from": "Portfolio AI <onboarding@resend.dev>",
-                    "to": [recipient_email],
-                    "subject": subject,
-                    "text": body,
-                },
-                timeout=10,
-            )
-            response.raise_for_status()
-            print(f"Email sent via Resend! ID: {response.json().get('id')}")
-            return True
-        except Exception as e:
-            print(f"Resend API failed: {e}")
+    return NOTIFIER.send(subject, body)
 
-    # METHOD 2: SendGrid API
-    sendgrid_key = os.getenv("SENDGRID_API_KEY", "").strip()
-    if sendgrid_key:
-        try:
-            response = requests.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers={"Authorization": f"Bearer {sendgrid_key}", "Content-Type": "application/json"},
-                json={
-                    "personalizations": [{"to": [{"email": recipient_email}]}],
-                    "from": {"email": from_email},
-                    "subject": subject,
-                    "content": [{"type": "text/plain", "value": body}],
-                },
-                timeout=10,
-            )
-            if response.status_code in [200, 201, 202]:
-                print(f"Email sent via SendGrid! Status: {response.status_code}")
-                return True
-            else:
-                print(f"SendGrid failed: {response.status_code} - {response.text}")
-        except Exception as e:
-            print(f"SendGrid API failed: {e}")
 
-    # METHOD 3: Gmail SMTP (Local fallback)
-    if not all([smtp_email, smtp_password, recipient_email]):
-        print("Email not configured (No Resend/SendGrid Key, No SMTP details).")
-        return False
+# Notifications are queued durably and delivered by a background worker so that a slow
+# email provider never holds up the chat reply.
+OUTBOX = Outbox(OUTBOX_PATH)
+OUTBOX_WORKER = OutboxWorker(
+    OUTBOX, send_email, digest_window=NOTIFY_DIGEST_WINDOW, digest_max_items=NOTIFY_DIGEST_MAX_ITEMS
+)
 
-    try:
-        msg = MIMEMultipart()
-        msg["From"] = smtp_email
-        msg["To"] = recipient_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
 
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=10) as server:
-            server.login(smtp_email, smtp_password)
-            server.send_message(msg)
+def queue_email(subject: str, body: str) -> None:
+    """Puts an email on the outbox and makes sure the delivery worker is running."""
+    OUTBOX.enqueue(subject, body)
+    OUTBOX_WORKER.start()
+    OUTBOX_WORKER.wake()
 
-        print(f"Email sent via SMTP successfully: {subject}")
-        return True
-    except Exception as e:
-        print(f"Failed to send email via SMTP: {e}")
-        return False
 
+def notify(kind: str, dedup_key: str, subject: str, body: str, priority: str = "normal") -> None:
+    """Queues a notification, or adds it to the digest when digest mode is on.
 
-def record_user(email: str, name: str = "-", notes: str = "-") -> dict[str, str]:
-    """Records user lead details and sends notification email."""
+    High-priority notifications flush the digest straight away, together with whatever it holds.
+    """
+    if NOTIFY_DIGEST_WINDOW <= 0:
+        queue_email(subject, body)
+        return
+    OUTBOX.add_to_digest(kind, dedup_key, subject, body)
+    if priority == "high":
+        OUTBOX.flush_digest()
+    OUTBOX_WORKER.start()
+    OUTBOX_WORKER.wake()
+
+
+def record_user(email: str, name: str = "-", notes: str = "-", priority: str = "normal") -> dict[str, str]:
+    """Records user lead details and queues a notification email."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     subject = f"🎯 New Portfolio Lead: {name}"
     body = f"New contact from portfolio AI chatbot:\n\nName: {name}\nEmail: {email}\nNotes: {notes}\n\nTime: {timestamp}\n"
-    send_email(subject, body)
+    notify("lead", email.strip().lower(), subject, body, priority)
     return {"status": "ok"}
 
 
 def record_issue(question: str) -> dict[str, str]:
-    """Records unanswered questions and notifies via email."""
+    """Records unanswered questions and queues a notification email."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     subject = "❓ Unknown Question from Portfolio AI"
     body = f"AI chatbot received a question it couldn't answer:\n\nQuestion: {question}\n\nTime: {timestamp}\n"
-    send_email(subject, body)
+    notify("question", normalize_message(question), subject, body)
     return {"status": "ok"}
 
 
@@ -128,6 +152,11 @@ TOOL_DEFS = [
                     "email": {"type": "string"},
                     "name": {"type": "string"},
                     "notes": {"type": "string"},
+                    "priority": {
+                        "type": "string",
+                        "enum": ["normal", "high"],
+                        "description": "high for a concrete job offer or project request",
+                    },
                 },
                 "required": ["email"],
             },
@@ -150,44 +179,226 @@ TOOL_DEFS = [
 ]
 
 
+def run_tool(name: str, arguments: str) -> str:
+    """Executes a tool call by name and returns its JSON-encoded result."""
+    with span(TOOL_SECONDS, "tool", tool=name if name in TOOLS else "unknown") as labels:
+        if name not in TOOLS:
+            labels["outcome"] = "error"
+            return json.dumps({"error": "Tool not found"})
+        try:
+            args = json.loads(arguments or "{}")
+            result = TOOLS[name](**args)
+            return json.dumps(result)
+        except Exception as e:
+            labels["outcome"] = "error"
+            return json.dumps({"error": str(e)})
+
+
+# Tool calls from one assistant message run concurrently on a small, bounded pool.
+TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=int(os.getenv("TOOL_WORKERS", 4)), thread_name_prefix="tool")
+
+
+def _tool_timeout_result(name: str, timeout: float) -> str:
+    print(f"Tool {name} timed out after {timeout}s")
+    return json.dumps({"error": f"Tool {name} timed out"})
+
+
+def run_tools(calls: list[tuple[str, str]], timeout: float = TOOL_TIMEOUT) -> list[str]:
+    """Runs (name, arguments) tool calls concurrently; results keep the call order.
+
+    A tool still running after `timeout` seconds gets an error result instead of blocking the turn.
+    """
+    # Each call runs in a copy of the caller's context so its span lands in the request trace.
+    futures = [
+        TOOL_EXECUTOR.submit(contextvars.copy_context().run, run_tool, name, arguments) for name, arguments in calls
+    ]
+    deadline = time.monotonic() + timeout
+    results = []
+    for (name, _), future in zip(calls, futures):
+        try:
+            results.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+        except FutureTimeoutError:
+            future.cancel()
+            results.append(_tool_timeout_result(name, timeout))
+    return results
+
+
+async def arun_tools(calls: list[tuple[str, str]], timeout: float = TOOL_TIMEOUT) -> list[str]:
+    """Async variant of `run_tools` built on asyncio.gather."""
+    loop = asyncio.get_running_loop()
+
+    async def one(name: str, arguments: str) -> str:
+        try:
+            ctx = contextvars.copy_context()
+            return await asyncio.wait_for(loop.run_in_executor(TOOL_EXECUTOR, ctx.run, run_tool, name, arguments), timeout)
+        except asyncio.TimeoutError:
+            return _tool_timeout_result(name, timeout)
+
+    return list(await asyncio.gather(*(one(name, arguments) for name, arguments in calls)))
+
+
 # --- 2. The Agent ---
 
+_upstream = None
+_upstream_config = None
+_upstream_lock = threading.Lock()
+
+
+def upstream() -> tuple[Any, Any, ModelRouter, UpstreamPool]:
+    """The OpenRouter clients, model router and connection pool, built on first use and shared by every persona.
+
+    One connection pool and one set of circuit breakers serve all agents in the process.
+    They are rebuilt only if the endpoint or key changes.
+    """
+    global _upstream, _upstream_config
+    config = (OPENROUTER_BASE_URL, os.getenv("OPENROUTER_API_KEY"))
+    with _upstream_lock:
+        if _upstream is None or _upstream_config != config:
+            # The OpenAI SDK is the heaviest import here; load it only when an agent is built.
+            from openai import AsyncOpenAI, OpenAI
+
+            client_kwargs = {
+                "api_key": config[1],
+                "base_url": config[0],
+                "default_headers": {
+                    "HTTP-Referer": "https://samirautanen.fi",
+                    "X-Title": "Sami Portfolio AI",
+                },
+                # With a fallback chain the router fails over instead of the SDK retrying the same model.
+                "max_retries": 0 if len(MODEL_CHAIN) > 1 else 2,
+            }
+            pool = UpstreamPool(
+                config[0],
+                max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", 20)),
+                max_keepalive=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", 10)),
+                keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", 120)),
+                http2=os.getenv("UPSTREAM_HTTP2", "1") != "0",
+                ping_interval=float(os.getenv("UPSTREAM_PING_INTERVAL", 50)),
+                active_window=float(os.getenv("UPSTREAM_ACTIVE_WINDOW", 900)),
+            )
+            router = ModelRouter(
+                MODEL_CHAIN,
+                hedge_delay=float(os.getenv("MODEL_HEDGE_DELAY", 8)),
+                failure_threshold=int(os.getenv("MODEL_BREAKER_FAILURES", 3)),
+                reset_timeout=float(os.getenv("MODEL_BREAKER_RESET", 30)),
+            )
+            _upstream = (
+                OpenAI(**client_kwargs, http_client=pool.client),
+                AsyncOpenAI(**client_kwargs, http_client=pool.async_client),
+                router,
+                pool,
+            )
+            _upstream_config = config
+        return _upstream
+
+
+async def close_upstream() -> None:
+    """Closes the shared connection pool at shutdown; an agent built afterwards gets a new one."""
+    global _upstream, _upstream_config
+    with _upstream_lock:
+        shared, _upstream, _upstream_config = _upstream, None, None
+    if shared is not None:
+        pool = shared[3]
+        pool.close()
+        await pool.aclose()
+
+
+def _persona_path(path: str | Path, persona: str | None) -> Path:
+    """`data/x.sqlite3` -> `data/x-<persona>.sqlite3`, so personas never share a state file."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}-{persona}{path.suffix}") if persona else path
+
+
 class Me:
-    def __init__(self):
-        self.api = OpenAI(
-            api_key=os.getenv("OPENROUTER_API_KEY"),
-            base_url="https://openrouter.ai/api/v1",
-            default_headers={
-                "HTTP-Referer": "https://samirautanen.fi",
-                "X-Title": "Sami Portfolio AI",
-            },
+    def __init__(self, context_dir: Path = BASE_DIR, persona: str | None = None):
+        self.context_dir = Path(context_dir)
+        self.persona = persona
+        self.api, self.async_api, self.router, self.pool = upstream()
+        self.cache = ResponseCache(
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 1_000_000)),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", 3600)),
+            path=_persona_path(RESPONSE_CACHE_PATH, persona) if RESPONSE_CACHE_PATH else None,
+        )
+        self.template = self._load_template()
+        # Canned and off-topic questions are answered locally; INTENT_ROUTER=0 sends everything to the model.
+        # The canned replies are the default agent's own words, so every other persona skips the router.
+        self.intents = IntentRouter() if os.getenv("INTENT_ROUTER", "1") != "0" and persona is None else None
+        # Identical questions arriving together (e.g. after a link is shared) share one upstream run.
+        self.flights = SingleFlight()
+        self.history_manager = HistoryManager(budget_tokens=int(os.getenv("HISTORY_TOKEN_BUDGET", 1500)))
+        # With RETRIEVAL_TOP_K=0 the whole bio is inlined into every prompt, as before.
+        self.retrieval_top_k = int(os.getenv("RETRIEVAL_TOP_K", 4))
+        self.index = (
+            RetrievalIndex(self.context_dir, _persona_path(RETRIEVAL_INDEX_PATH, persona)) if self.retrieval_top_k > 0 else None
         )
+        self.context_fingerprint = self._context_fingerprint()
         self.bio = self._load_bio()
         self.system_prompt = self._build_system_prompt()
 
-    def _load_bio(self) -> str:
-        """Loads biographical context files from the me/ directory."""
-        bio_parts = []
+    def _context_fingerprint(self) -> tuple:
+        """Modification times and sizes of the context files and prompt template, used to detect edits."""
         try:
-            summary_path = BASE_DIR / "summary.txt"
-            if summary_path.exists():
-                bio_parts.append(summary_path.read_text(encoding="utf-8"))
+            files = sorted([*self.context_dir.glob("*.txt"), *self.context_dir.glob(PROMPT_TEMPLATE_NAME)])
+            return tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in files)
+        except OSError:
+            return ()
+
+    def refresh_context(self) -> bool:
+        """Reloads the bio and prompt if context files changed; returns True when it did."""
+        fingerprint = self._context_fingerprint()
+        if fingerprint == self.context_fingerprint:
+            return False
+        print("Context files changed, rebuilding system prompt.")
+        self.context_fingerprint = fingerprint
+        self.template = self._load_template()
+        self.bio = self._load_bio()
+        self.system_prompt = self._build_system_prompt()
+        if self.index:
+            self.index.refresh()
+        # Cache keys include the prompt hash, so stale replies can never match again.
+        self.cache.clear()
+        return True
 
-            linkedin_path = BASE_DIR / "linkedin.txt"
-            if linkedin_path.exists():
-                bio_parts.append(linkedin_path.read_text(encoding="utf-8"))
+    def prompt_for(self, msg: str, history: list[dict[str, Any]]) -> str:
+        """System prompt for this turn: file overviews plus the bio chunks most relevant to the question."""
+        if self.index is None:
+            return self.system_prompt
+        # Include the previous user turn so follow-ups ("tell me more") keep their topic.
+        previous = next((m.get("content") or "" for m in reversed(history) if m.get("role") == "user"), "")
+        overview = self.index.overview()
+        relevant = [c for c in self.index.search(f"{msg}\n{previous}", self.retrieval_top_k) if c not in overview]
+        return self._build_system_prompt("\n\n".join(overview + relevant))
 
-            portfolio_path = BASE_DIR / "portfolio.txt"
-            if portfolio_path.exists():
-                bio_parts.append(portfolio_path.read_text(encoding="utf-8"))
+    def _load_bio(self) -> str:
+        """Loads biographical context files from the context directory."""
+        bio_parts = []
+        try:
+            others = sorted(p.name for p in self.context_dir.glob("*.txt") if p.name not in BIO_FILES)
+            for name in (*BIO_FILES, *others):
+                path = self.context_dir / name
+                if path.exists():
+                    bio_parts.append(path.read_text(encoding="utf-8"))
 
             return "\n\n".join(bio_parts) if bio_parts else "Context missing."
         except Exception as e:
             print(f"Error loading context: {e}")
             return "Context missing."
 
-    def _build_system_prompt(self) -> str:
-        """Constructs the system prompt with identity rules and loaded bio."""
+    def _load_template(self) -> Template | None:
+        """The persona's own prompt template, parsed once; None means the built-in prompt."""
+        path = self.context_dir / PROMPT_TEMPLATE_NAME
+        try:
+            return Template(path.read_text(encoding="utf-8")) if path.exists() else None
+        except OSError as e:
+            print(f"Error loading prompt template: {e}")
+            return None
+
+    def _build_system_prompt(self, bio: str | None = None) -> str:
+        """Constructs the system prompt with identity rules and loaded bio (or the given excerpt of it)."""
+        bio = self.bio if bio is None else bio
+        if self.template is not None:
+            return self.template.safe_substitute(bio=bio)
+        canned = {intent: replies["en"] for intent, replies in CANNED_REPLIES.items()}
         return f"""You ARE Sami Rautanen. This is not role-play—you are me.
 
 IDENTITY RULES (CRITICAL):
@@ -198,7 +409,7 @@ IDENTITY RULES (CRITICAL):
 5. If you catch yourself using third-person, STOP and rephrase
 
 WHO I AM:
-{self.bio}
+{bio}
 
 CURRENT AVAILABILITY (JUNE 2026):
 - Status: Pre-selected for Saranen Future Skills Academy recruitment training.
@@ -242,9 +453,9 @@ SCOPE GUARDRAILS (CRITICAL):
 
 OFF-TOPIC HANDLING:
 - Random tech questions: "I'm here to talk about my work and what I can build. If you have a specific project in mind, send me an email at samrude1@outlook.com"
-- Debugging help: "I can't debug code in this chat, but if you need help with a project, reach out via email and we can discuss."
-- General tutorials: "I'm not a tutorial bot—I'm here to showcase my portfolio. Check out my GitHub for examples of my work, or email me if you want to collaborate."
-- Completely unrelated: "That's outside my scope—I'm here to talk about my AI development work and projects. What would you like to know about what I build?"
+- Debugging help: "{canned['debugging']}"
+- General tutorials: "{canned['tutorial']}"
+- Completely unrelated: "{canned['unrelated']}"
 
 EXAMPLE EXCHANGES:
 
@@ -274,16 +485,17 @@ User: "What's the best way to learn Python?"
 
 User: "What do you think about the latest iPhone?"
 ❌ WRONG: "The latest iPhone has some great features..."
-✅ CORRECT: "That's outside my scope—I'm here to talk about my AI development work and projects. What would you like to know about what I build?"
+✅ CORRECT: "{canned['unrelated']}"
 
 User: "Are you looking for work?" / "Are you available for hire?"
 ❌ WRONG: "I might be open to opportunities."
-✅ CORRECT: "Yes! I've recently been pre-selected for the Saranen Future Skills Academy recruitment training program. I'm currently looking for an innovative company to partner with for this program—specifically roles focusing on Agentic AI or Technical Architecture. I'm flexible on remote/hybrid work and ready to start. Want to discuss a potential partnership? Email me at samrude1@outlook.com."
+✅ CORRECT: "{canned['availability']}"
 
 TOOLS (CRITICAL - ALWAYS USE WHEN APPLICABLE):
 - **record_user_details**: MUST call IMMEDIATELY when user provides email address or contact info
   * Example triggers: "my email is", "reach me at", "contact me at", user gives email
   * Capture: email (required), name (if given), notes (context about their inquiry)
+  * Set priority "high" for a concrete job offer or project request, otherwise leave it out
   
 - **record_unknown_question**: Use when you don't know answer to important question
 
@@ -291,46 +503,230 @@ IMPORTANT: When user gives email → call record_user_details tool BEFORE respon
 
 Remember: You are not an assistant describing Sami. You ARE Sami."""
 
+    def _route(self, msg: str, labels: dict[str, Any]) -> Route | None:
+        """The local intent router's canned reply for `msg`, or None to ask the model."""
+        route = self.intents.route(msg) if self.intents else None
+        if route:
+            labels["outcome"] = "intent"
+            INTENT_ROUTED.inc(intent=route.intent, language=route.language)
+        return route
+
+    def _fit_token_budget(self, system_prompt: str, history: list[dict[str, Any]], msg: str) -> list[dict[str, Any]]:
+        """Drops the oldest history until the estimated prompt fits the remaining token budget.
+
+        Raises BudgetExceeded when even the system prompt and the message alone do not fit.
+        """
+        if not TOKEN_BUDGET.enabled:
+            return history
+        remaining, scope, retry_after = TOKEN_BUDGET.remaining(current_client())
+        estimate = count_tokens(system_prompt) + count_tokens(msg) + sum(message_tokens(m) for m in history)
+        if estimate <= remaining:
+            return history
+        kept = list(history)
+        while kept and estimate > remaining:
+            estimate -= message_tokens(kept.pop(0))
+        if estimate > remaining:
+            TOKEN_BUDGET_ACTIONS.inc(action="rejected", scope=scope)
+            raise BudgetExceeded(scope, retry_after)
+        TOKEN_BUDGET_ACTIONS.inc(action="trimmed", scope=scope)
+        print(f"Token budget ({scope}): trimmed history from {len(history)} to {len(kept)} messages.")
+        return kept
+
     def chat(self, msg: str, history: list[dict[str, Any]]) -> str:
         """Processes user chat messages and returns the assistant response."""
-        msgs = [{"role": "system", "content": self.system_prompt}] + history + [{"role": "user", "content": msg}]
-        max_iter = 5
+        self.pool.touch()
+        with trace("chat") as t:
+            with span(CHAT_SECONDS, "chat", mode="sync") as labels:
+                reply = self._chat(msg, history, t, labels)
+            CHAT_ITERATIONS.observe(t.attrs.get("iterations", 0), mode="sync")
+        return reply
+
+    def _chat(self, msg: str, history: list[dict[str, Any]], t: Trace, labels: dict[str, Any]) -> str:
+        route = self._route(msg, labels)
+        if route:
+            return route.reply
+        self.refresh_context()
+        cache_key = self.cache.key(msg, history, self.system_prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            labels["outcome"] = "cache"
+            return cached
+
+        # Each caller is checked against its own budget before joining a flight, so one client's
+        # exhausted budget never fails (or waves through) another client's identical request.
+        system_prompt, fitted = self._prepare(msg, history)
+
+        # Tools run once, in the leader's turn; followers get the same reply without repeating them.
+        # The cache key only covers recent history, so the flight key adds the full history.
+        flight_key = (cache_key, history_hash(history))
+        reply, shared = self.flights.do(flight_key, lambda: self._complete(msg, system_prompt, fitted, cache_key, t, labels))
+        if shared:
+            labels["outcome"] = "coalesced"
+            CHAT_COALESCED.inc(mode="sync")
+        return reply
+
+    def _prepare(self, msg: str, history: list[dict[str, Any]]) -> tuple[str, list[dict[str, Any]]]:
+        """This turn's system prompt and its history, compacted and fitted to the current client's budget."""
+        system_prompt = self.prompt_for(msg, history)
+        history = self.history_manager.compact(history, reserved_tokens=count_tokens(msg))
+        return system_prompt, self._fit_token_budget(system_prompt, history, msg)
+
+    def _complete(
+        self, msg: str, system_prompt: str, history: list[dict[str, Any]], cache_key: str, t: Trace, labels: dict[str, Any]
+    ) -> str:
+        msgs = [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": msg}]
         iter_count = 0
-        model_name = "openai/gpt-4o-mini"
 
-        while iter_count < max_iter:
+        while iter_count < MAX_ITER:
             iter_count += 1
+            t.attrs["iterations"] = iter_count
             try:
-                print(f"Attempting chat with model: {model_name} (Iter {iter_count})")
-                res = self.api.chat.completions.create(
-                    model=model_name,
-                    messages=msgs,
-                    tools=TOOL_DEFS,
-                    timeout=30.0,
-                )
+                print(f"Attempting chat (Iter {iter_count})")
+                with span(COMPLETION_SECONDS, "completion", model="none") as completion:
+                    res, model_name = self.router.create(
+                        self.api.chat.completions.create,
+                        messages=msgs,
+                        tools=TOOL_DEFS,
+                        timeout=30.0,
+                    )
+                    completion["model"] = model_name
+                print(f"Answered by model: {model_name}")
             except Exception as e:
-                print(f"CRITICAL: Model {model_name} failed: {e}")
+                print(f"CRITICAL: All models failed: {e}")
+                labels["outcome"] = "error"
                 return "I'm having trouble connecting to my brain right now. Please try again in a moment."
 
+            # Some providers omit usage; token metrics then simply skip this call.
+            usage = getattr(res, "usage", None)
+            if usage:
+                record_usage(model_name, usage.prompt_tokens or 0, usage.completion_tokens or 0)
+
             msg_obj = res.choices[0].message
 
             if not msg_obj.tool_calls:
+                # Turns that ran tools have side effects (emails) and must not be replayed from cache.
+                if iter_count == 1 and msg_obj.content:
+                    self.cache.put(cache_key, msg_obj.content)
                 return msg_obj.content
 
             msgs.append(msg_obj)
             for tc in msg_obj.tool_calls:
-                print(f"Tool call ({iter_count}/{max_iter}): {tc.function.name}")
-                if tc.function.name in TOOLS:
-                    try:
-                        args = json.loads(tc.function.arguments)
-                        result = TOOLS[tc.function.name](**args)
-                        res_content = json.dumps(result)
-                    except Exception as e:
-                        res_content = json.dumps({"error": str(e)})
-                else:
-                    res_content = json.dumps({"error": "Tool not found"})
-
+                print(f"Tool call ({iter_count}/{MAX_ITER}): {tc.function.name}")
+            results = run_tools([(tc.function.name, tc.function.arguments) for tc in msg_obj.tool_calls])
+            for tc, res_content in zip(msg_obj.tool_calls, results):
                 msgs.append({"role": "tool", "content": res_content, "tool_call_id": tc.id})
 
+        labels["outcome"] = "max_iter"
         return "I'm doing a lot of thinking! Let's pause here. What was your main question?"
 
+    async def achat(self, msg: str, history: list[dict[str, Any]]) -> AsyncIterator[str]:
+        """Streams the assistant response token by token, running tool calls between segments."""
+        self.pool.touch()
+        with trace("chat_stream") as t:
+            with span(CHAT_SECONDS, "chat", mode="stream") as labels:
+                async for token in self._achat(msg, history, t, labels):
+                    yield token
+            CHAT_ITERATIONS.observe(t.attrs.get("iterations", 0), mode="stream")
+
+    async def _achat(self, msg: str, history: list[dict[str, Any]], t: Trace, labels: dict[str, Any]) -> AsyncIterator[str]:
+        route = self._route(msg, labels)
+        if route:
+            yield route.reply
+            return
+        self.refresh_context()
+        cache_key = self.cache.key(msg, history, self.system_prompt)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            labels["outcome"] = "cache"
+            yield cached
+            return
+
+        # The budget lookup is SQLite I/O, so it runs off the event loop (contextvars are copied).
+        system_prompt, fitted = await asyncio.to_thread(self._prepare, msg, history)
+
+        flight_key = (cache_key, history_hash(history))
+        tokens, shared = self.flights.stream(
+            flight_key, lambda: self._acomplete(msg, system_prompt, fitted, cache_key, t, labels)
+        )
+        if shared:
+            labels["outcome"] = "coalesced"
+            CHAT_COALESCED.inc(mode="stream")
+        async for token in tokens:
+            yield token
+
+    async def _acomplete(
+        self, msg: str, system_prompt: str, history: list[dict[str, Any]], cache_key: str, t: Trace, labels: dict[str, Any]
+    ) -> AsyncIterator[str]:
+        msgs = [{"role": "system", "content": system_prompt}] + history + [{"role": "user", "content": msg}]
+        iter_count = 0
+
+        async def close_stream(stream):
+            await stream.close()
+
+        while iter_count < MAX_ITER:
+            iter_count += 1
+            t.attrs["iterations"] = iter_count
+            # Tool calls arrive as fragments keyed by index; assemble them as the stream goes.
+            tool_calls: dict[int, dict[str, Any]] = {}
+            content_parts = []
+            try:
+                print(f"Attempting streamed chat (Iter {iter_count})")
+                # The completion span covers the whole stream, not just the first byte.
+                with span(COMPLETION_SECONDS, "completion", model="none") as completion:
+                    # Hedging applies to time-to-first-byte; the losing stream is closed.
+                    stream, model_name = await self.router.acreate(
+                        self.async_api.chat.completions.create,
+                        on_discard=close_stream,
+                        messages=msgs,
+                        tools=TOOL_DEFS,
+                        timeout=30.0,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+                    completion["model"] = model_name
+                    print(f"Streaming from model: {model_name}")
+                    async for chunk in stream:
+                        if chunk.usage:
+                            # Charging writes to the shared budget file; keep it off the event loop.
+                            await asyncio.to_thread(
+                                record_usage, model_name, chunk.usage.prompt_tokens or 0, chunk.usage.completion_tokens or 0
+                            )
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        if delta.content:
+                            content_parts.append(delta.content)
+                            yield delta.content
+                        for tc_delta in delta.tool_calls or []:
+                            tc = tool_calls.setdefault(
+                                tc_delta.index,
+                                {"id": "", "type": "function", "function": {"name": "", "arguments": ""}},
+                            )
+                            if tc_delta.id:
+                                tc["id"] = tc_delta.id
+                            if tc_delta.function:
+                                if tc_delta.function.name:
+                                    tc["function"]["name"] += tc_delta.function.name
+                                if tc_delta.function.arguments:
+                                    tc["function"]["arguments"] += tc_delta.function.arguments
+            except Exception as e:
+                print(f"CRITICAL: Streamed chat failed: {e}")
+                labels["outcome"] = "error"
+                yield "I'm having trouble connecting to my brain right now. Please try again in a moment."
+                return
+
+            if not tool_calls:
+                if iter_count == 1 and content_parts:
+                    self.cache.put(cache_key, "".join(content_parts))
+                return
+
+            ordered_calls = [tool_calls[i] for i in sorted(tool_calls)]
+            msgs.append({"role": "assistant", "content": "".join(content_parts) or None, "tool_calls": ordered_calls})
+            for tc in ordered_calls:
+                print(f"Tool call ({iter_count}/{MAX_ITER}): {tc['function']['name']}")
+            results = await arun_tools([(tc["function"]["name"], tc["function"]["arguments"]) for tc in ordered_calls])
+            for tc, res_content in zip(ordered_calls, results):
+                msgs.append({"role": "tool", "content": res_content, "tool_call_id": tc["id"]})
+
+        labels["outcome"] = "max_iter"
+        yield "I'm doing a lot of thinking! Let's pause here. What was your main question?"
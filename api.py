@@ -1,19 +1,228 @@
 # api.py
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel, Field
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+import anyio.to_thread
+from dotenv import load_dotenv
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from fastapi.middleware.cors import CORSMiddleware
+from limits import parse_many
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from agent_logic import Me
+from admission import AdmissionController, Overloaded
+from metrics import HTTP_SECONDS, REGISTRY
+from personas import PersonaRegistry, UnknownPersona
+from rate_limit_store import SQLiteStorage  # noqa: F401  (registers the sqlite:// limiter storage)
+from sessions import SessionStore
+from token_budget import BudgetExceeded, billing
+
+load_dotenv(override=True)
+
+# Cold start: the agent module (OpenAI SDK, email stack, context files, indexes) is imported
+# and built in a background thread, so the port binds and /health answers right away.
+agent_logic = None
+my_agent = None
+_agent_ready = threading.Event()
+_agent_init_lock = threading.Lock()
+_agent_init_started = False
+AGENT_READY_TIMEOUT = float(os.environ.get("AGENT_READY_TIMEOUT", 20))
+
+
+def _init_agent():
+    global agent_logic, my_agent
+    start = time.perf_counter()
+    try:
+        import agent_logic as module
+
+        agent_logic = module
+        # Deliver anything left in the email outbox by a previous run.
+        module.OUTBOX_WORKER.start()
+        my_agent = module.Me()
+        print(f"Agent initialized successfully in {time.perf_counter() - start:.2f}s.")
+    except Exception as e:
+        print(f"Failed to initialize agent: {e}")
+        my_agent = None
+    finally:
+        _agent_ready.set()
+
+
+def start_agent_init():
+    """Starts building the agent in the background (once per process)."""
+    global _agent_init_started
+    with _agent_init_lock:
+        if _agent_init_started:
+            return
+        _agent_init_started = True
+    threading.Thread(target=_init_agent, name="agent-init", daemon=True).start()
+
+
+def _wait_for_startup():
+    """Blocks until background start-up has finished; 503 if it takes too long."""
+    if not _agent_ready.wait(AGENT_READY_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Agent is starting up", headers={"Retry-After": "5"})
+
+
+# Extra personas: one directory per persona under PERSONAS_DIR, built on first request.
+PERSONAS = PersonaRegistry(
+    Path(os.environ.get("PERSONAS_DIR", Path(__file__).parent / "personas")),
+    factory=lambda persona_id, directory: agent_logic.Me(context_dir=directory, persona=persona_id),
+    max_loaded=int(os.environ.get("PERSONAS_MAX_LOADED", 4)),
+    idle_ttl=float(os.environ.get("PERSONA_IDLE_TTL", 3600)),
+)
+
+
+def _require_agent(persona: str | None = None):
+    """Returns the initialized agent (or the named persona's), waiting for start-up if needed.
+
+    500 if start-up failed, 404 for an unknown persona.
+    """
+    _wait_for_startup()
+    if not my_agent:
+        raise HTTPException(status_code=500, detail="Agent not initialized")
+    if not persona:
+        return my_agent
+    try:
+        return PERSONAS.get(persona)
+    except UnknownPersona:
+        raise HTTPException(status_code=404, detail=f"Unknown persona: {persona}")
+
+
+# Backpressure: at most CHAT_MAX_CONCURRENCY chat requests run at once and CHAT_QUEUE_SIZE more
+# wait up to CHAT_QUEUE_TIMEOUT seconds; the rest get 503 + Retry-After right away.
+ADMISSION = AdmissionController(
+    max_concurrent=int(os.environ.get("CHAT_MAX_CONCURRENCY", 8)),
+    max_queue=int(os.environ.get("CHAT_QUEUE_SIZE", 16)),
+    max_wait=float(os.environ.get("CHAT_QUEUE_TIMEOUT", 5)),
+)
+# Matched as path suffixes, so persona routes (/personas/{persona}/chat) are covered too.
+ADMISSION_PATHS = ("/chat", "/chat/stream")
+# Threadpool threads kept free of chat work so /health and friends always answer.
+HEALTH_RESERVED_THREADS = int(os.environ.get("HEALTH_RESERVED_THREADS", 4))
+
+
+# Set UPSTREAM_PREWARM=0 to skip opening upstream connections before the first visitor.
+UPSTREAM_PREWARM = os.environ.get("UPSTREAM_PREWARM", "1") != "0"
+
+
+async def _keep_upstream_warm():
+    """Once the agent is built, opens the shared upstream connections and keeps them warm."""
+    while not _agent_ready.is_set():
+        await asyncio.sleep(0.05)
+    if my_agent:
+        await my_agent.pool.keep_warm()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threads = anyio.to_thread.current_default_thread_limiter()
+    threads.total_tokens = max(threads.total_tokens, ADMISSION.max_concurrent + HEALTH_RESERVED_THREADS)
+    start_agent_init()
+    warmer = asyncio.create_task(_keep_upstream_warm()) if UPSTREAM_PREWARM else None
+    yield
+    if warmer:
+        warmer.cancel()
+        # Let an in-flight ping unwind before its client is closed.
+        await asyncio.gather(warmer, return_exceptions=True)
+    if agent_logic:
+        agent_logic.OUTBOX_WORKER.stop()
+        agent_logic.NOTIFIER.close()
+        await agent_logic.close_upstream()
+
 
 # Security: Rate Limiter (5 requests per minute, max 50 requests per day per IP)
-limiter = Limiter(key_func=get_remote_address)
-app = FastAPI(title="Sami Rautanen AI Clone API", version="1.0.0")
+# Counters live in a SQLite file so every uvicorn/gunicorn worker enforces the same budget.
+RATE_LIMIT_STORAGE_URI = os.environ.get(
+    "RATE_LIMIT_STORAGE_URI",
+    f"sqlite:///{(Path(__file__).parent / 'data' / 'ratelimit.sqlite3').as_posix()}",
+)
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI)
+# Semicolon-separated; load tests raise this so one client IP can drive the whole pipeline.
+# /chat and /chat/stream (and their persona routes) draw on one shared per-IP budget.
+CHAT_RATE_LIMITS = os.environ.get("CHAT_RATE_LIMITS", "5/minute;50/day")
+CHAT_RATE_LIMIT_ITEMS = parse_many(CHAT_RATE_LIMITS)
+app = FastAPI(title="Sami Rautanen AI Clone API", version="1.0.0", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+class MetricsMiddleware:
+    """Times every HTTP request, including streamed bodies, into `http_request_seconds`."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Label by route template, not raw path, to keep the series count bounded.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route, status=status)
+
+
+def _spent_chat_limit(scope):
+    """The shared chat limit this client has already used up, if any; checks without counting a hit."""
+    if not limiter.enabled:
+        return None
+    key = get_remote_address(Request(scope))
+    return next((item for item in CHAT_RATE_LIMIT_ITEMS if not limiter.limiter.test(item, key, "chat")), None)
+
+
+class AdmissionMiddleware:
+    """Holds an admission slot for the whole chat request (including a streamed body), or answers 503.
+
+    Clients over their per-IP chat rate limit get 429 first, without touching the queue.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].endswith(ADMISSION_PATHS) or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        # Over-limit clients are turned away before they can take a slot or queue place; the route's
+        # shared_limit still counts the hit for everyone admitted.
+        spent = _spent_chat_limit(scope)
+        if spent is not None:
+            response = JSONResponse({"error": f"Rate limit exceeded: {spent}"}, status_code=429)
+            return await response(scope, receive, send)
+        admission = ADMISSION
+        try:
+            await admission.acquire()
+        except Overloaded as e:
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -23,23 +232,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Agent
-try:
-    my_agent = Me()
-    print("Agent initialized successfully.")
-except Exception as e:
-    print(f"Failed to initialize agent: {e}")
-    my_agent = None
-
 
 class ChatMessage(BaseModel):
     role: str
     content: str
 
 
+# Only the newest messages of a longer history are kept; the agent compacts those to its token budget.
+MAX_HISTORY_MESSAGES = int(os.environ.get("MAX_HISTORY_MESSAGES", 100))
+
+
 class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000)
     history: list[ChatMessage] = Field(default_factory=list)
+    # Session mode: the server keeps the history and the client sends only the new message.
+    session_id: str | None = Field(default=None, max_length=64)
+
+    @field_validator("history")
+    @classmethod
+    def keep_newest_history(cls, history: list[ChatMessage]) -> list[ChatMessage]:
+        # The frontend resends the whole conversation, so a long one must not turn into a 422.
+        return history[-MAX_HISTORY_MESSAGES:] if len(history) > MAX_HISTORY_MESSAGES else history
+
+
+# Set SESSION_STORE_PATH to an empty string to keep sessions in memory only.
+SESSION_STORE_PATH = os.environ.get("SESSION_STORE_PATH", str(Path(__file__).parent / "data" / "sessions.sqlite3"))
+SESSIONS = SessionStore(
+    max_bytes=int(os.environ.get("SESSION_STORE_MAX_BYTES", 5_000_000)),
+    idle_ttl=float(os.environ.get("SESSION_IDLE_TTL", 3600)),
+    max_messages=MAX_HISTORY_MESSAGES,
+    path=SESSION_STORE_PATH or None,
+)
+
+
+def _resolve_history(req: ChatRequest) -> tuple[list[dict], str | None]:
+    """History for this turn and the session id to answer with (None in stateless mode).
+
+    An unknown or expired session id starts a new session under a fresh server-issued id;
+    `history`, if sent, seeds it so a client can switch to session mode mid-conversation.
+    """
+    request_history = [{"role": m.role, "content": m.content} for m in req.history]
+    if req.session_id is None:
+        return request_history, None
+    history = SESSIONS.get(req.session_id)
+    if history is not None:
+        return history, req.session_id
+    session_id = SessionStore.new_id()
+    if request_history:
+        SESSIONS.append(session_id, request_history)
+    return request_history, session_id
+
+
+def _record_turn(session_id: str | None, message: str, reply: str) -> None:
+    if session_id is not None:
+        SESSIONS.append(session_id, [{"role": "user", "content": message}, {"role": "assistant", "content": reply}])
 
 
 @app.get("/")
@@ -52,26 +298,131 @@ def read_root():
 @app.head("/health")
 def health_check():
     """Health check endpoint for monitoring services"""
-    return {"status": "healthy"}
+    return {"status": "healthy", "agent_ready": _agent_ready.is_set()}
 
 
-@app.post("/chat")
-@limiter.limit("5/minute")
-@limiter.limit("50/day")
-def chat_endpoint(req: ChatRequest, request: Request):
-    if not my_agent:
+@app.get("/health/outbox")
+def outbox_status():
+    """Email outbox queue depth and delivery latency"""
+    _wait_for_startup()
+    if not agent_logic:
         raise HTTPException(status_code=500, detail="Agent not initialized")
+    return {"worker_running": agent_logic.OUTBOX_WORKER.running, **agent_logic.OUTBOX.status()}
+
+
+@app.get("/health/cache")
+def cache_status():
+    """Response cache size and hit/miss counters, plus single-flight coalescing counts"""
+    agent = _require_agent()
+    return {**agent.cache.stats(), "singleflight": agent.flights.stats()}
+
+
+@app.get("/health/models")
+def models_status():
+    """Per-model call counts, circuit breaker state and hedge delay"""
+    return _require_agent().router.stats()
 
-    history_dicts = [{"role": m.role, "content": m.content} for m in req.history]
+
+@app.get("/health/admission")
+def admission_status():
+    """Chat concurrency limiter: active and queued requests, rejections and timeouts"""
+    return ADMISSION.stats()
+
+
+@app.get("/health/personas")
+def personas_status():
+    """Available and loaded personas, loads and evictions"""
+    return PERSONAS.stats()
+
+
+@app.get("/health/sessions")
+def sessions_status():
+    """Server-side session count, size and eviction counters"""
+    return SESSIONS.stats()
+
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    """Forgets a server-side conversation"""
+    SESSIONS.delete(session_id)
+    return {"status": "deleted"}
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus metrics: request, completion, tool and email latencies, iterations and tokens"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Personas are chosen by path (/personas/{persona}/chat) or by the X-Persona header.
+@app.post("/chat")
+@app.post("/personas/{persona}/chat")
+@limiter.shared_limit(CHAT_RATE_LIMITS, scope="chat")
+def chat_endpoint(req: ChatRequest, request: Request, persona: str | None = None, x_persona: str | None = Header(default=None)):
+    agent = _require_agent(persona or x_persona)
+
+    history_dicts, session_id = _resolve_history(req)
 
     try:
-        response_text = my_agent.chat(req.message, history_dicts)
-        return {"reply": response_text}
+        with billing(get_remote_address(request)):
+            response_text = agent.chat(req.message, history_dicts)
+        if session_id is None:
+            return {"reply": response_text}
+        _record_turn(session_id, req.message, response_text)
+        return {"reply": response_text, "session_id": session_id}
+    except BudgetExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         print(f"Error in chat processing: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+@app.post("/personas/{persona}/chat/stream")
+@limiter.shared_limit(CHAT_RATE_LIMITS, scope="chat")
+async def chat_stream_endpoint(
+    req: ChatRequest, request: Request, persona: str | None = None, x_persona: str | None = Header(default=None)
+):
+    """Streams the reply as Server-Sent Events: `token` events, then a final `done` with the full reply."""
+    agent = await run_in_threadpool(_require_agent, persona or x_persona)
+    client = get_remote_address(request)
+    # Once the stream has started the status is 200, so an exhausted budget is refused up front.
+    remaining, _, retry_after = await run_in_threadpool(agent_logic.TOKEN_BUDGET.remaining, client)
+    if remaining <= 0:
+        raise HTTPException(status_code=429, detail="Token budget exhausted", headers={"Retry-After": str(retry_after)})
+
+    history_dicts, session_id = await run_in_threadpool(_resolve_history, req)
+
+    async def event_stream():
+        reply_parts = []
+        try:
+            with billing(client):
+                async for token in agent.achat(req.message, history_dicts):
+                    reply_parts.append(token)
+                    yield _sse("token", {"token": token})
+            reply = "".join(reply_parts)
+            if session_id is None:
+                yield _sse("done", {"reply": reply})
+            else:
+                await run_in_threadpool(_record_turn, session_id, req.message, reply)
+                yield _sse("done", {"reply": reply, "session_id": session_id})
+        except BudgetExceeded as e:
+            yield _sse("error", {"detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            print(f"Error in streamed chat processing: {e}")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8000)))
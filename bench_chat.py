@@ -0,0 +1,290 @@
+"""
+Load test: drives `/chat` or `/chat/stream` of a real uvicorn process wired to local upstream stubs.
+
+The API runs in a subprocess whose OpenRouter and Resend URLs point at `local_stubs` servers
+(configurable model latency, optional tool-call script, email latency) and whose runtime state
+lives in a temporary directory. Requests are sent at a fixed concurrency and the report gives
+p50/p95/p99 latency, requests/second, failure rate and upstream call counts, tagged with the git
+commit so runs can be compared with `--compare`. `/health` is probed throughout the run, so a
+spike (high `--concurrency`) shows whether chat traffic starves the health check; the chat
+admission limits (`CHAT_MAX_CONCURRENCY`, ...) are taken from the environment.
+
+Usage: python bench_chat.py [--requests 200] [--concurrency 8] [--endpoint chat|stream]
+                            [--scenario plain|tools] [--llm-latency 0.2] [--email-latency 0.05]
+                            [--workers 1] [--cache] [--out results.json] [--compare previous.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+from local_stubs import FakeOpenAIServer, StubEmailAPI
+
+ROOT = Path(__file__).parent
+
+MESSAGES = [
+    "Are you available for hire?",
+    "What's your background?",
+    "What multi-agent systems have you built?",
+    "Do you have experience deploying on AWS?",
+    "Which programming languages do you use?",
+    "Oletko saatavilla töihin?",
+]
+
+# The tools scenario records a lead on the first round, then answers.
+SCRIPTS = {
+    "plain": None,
+    "tools": [
+        {"tool_calls": [{"name": "record_user_details", "arguments": {"email": "visitor@example.com", "name": "Load Test"}}]},
+        {"reply": "Thanks, I'll be in touch by email soon."},
+    ],
+}
+
+COMPARED = ("rps", "latency_ms.p50", "latency_ms.p95", "latency_ms.p99", "failure_rate")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def git_commit() -> str | None:
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+
+def start_api(port: int, workers: int, env: dict[str, str], timeout: float = 60.0) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).json().get("agent_ready"):
+                return proc
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("API never became ready")
+
+
+def wait_for_outbox(base_url: str, timeout: float = 10.0) -> None:
+    """Emails leave through the outbox after the reply; waits until it has drained."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if requests.get(f"{base_url}/health/outbox", timeout=5).json().get("pending", 0) == 0:
+            return
+        time.sleep(0.1)
+
+
+class Driver:
+    """Sends requests from a thread pool; each thread keeps its own keep-alive session."""
+
+    def __init__(self, base_url: str, endpoint: str, unique: bool):
+        self.url = f"{base_url}/chat/stream" if endpoint == "stream" else f"{base_url}/chat"
+        self.stream = endpoint == "stream"
+        self.unique = unique
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def one(self, i: int) -> dict:
+        message = MESSAGES[i % len(MESSAGES)]
+        if self.unique:
+            message = f"{message} (#{i})"
+        start = time.perf_counter()
+        first_token = None
+        try:
+            response = self._session().post(self.url, json={"message": message, "history": []}, stream=self.stream, timeout=60)
+            ok = response.status_code == 200
+            if self.stream and ok:
+                for line in response.iter_lines():
+                    if first_token is None and line.startswith(b"event: token"):
+                        first_token = time.perf_counter() - start
+                    if line.startswith(b"event: error"):
+                        ok = False
+            else:
+                response.content
+            status = response.status_code
+        except requests.RequestException:
+            ok, status = False, "exception"
+        return {"ok": ok, "status": status, "latency": time.perf_counter() - start, "first_token": first_token}
+
+
+class HealthProbe(threading.Thread):
+    """Polls /health every `interval` seconds until stopped, recording latency and failures."""
+
+    def __init__(self, base_url: str, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.url = f"{base_url}/health"
+        self.interval = interval
+        self.latencies: list[float] = []
+        self.failures = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        session = requests.Session()
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                ok = session.get(self.url, timeout=5).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                self.latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                self.failures += 1
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> dict:
+        self._stop_event.set()
+        self.join()
+        latencies = self.latencies or [float("nan")]
+        return {
+            "p50": round(percentile(latencies, 0.5), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "max": round(max(latencies), 1),
+            "failures": self.failures,
+        }
+
+
+def run(args) -> dict:
+    llm = FakeOpenAIServer(latency=args.llm_latency, script=SCRIPTS[args.scenario]).start()
+    email = StubEmailAPI(response_delay=args.email_latency).start()
+    port = free_port()
+    tmp = tempfile.TemporaryDirectory()
+    data = Path(tmp.name)
+    env = {
+        **os.environ,
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": llm.base_url,
+        "RESEND_API_KEY": "bench",
+        "RESEND_URL": email.url,
+        "RECIPIENT_EMAIL": "owner@example.com",
+        "SENDGRID_API_KEY": "",
+        "OUTBOX_PATH": str(data / "outbox.sqlite3"),
+        "RESPONSE_CACHE_PATH": str(data / "response_cache.sqlite3") if args.cache else "",
+        "RETRIEVAL_INDEX_PATH": str(data / "retrieval_index.json"),
+        "RATE_LIMIT_STORAGE_URI": f"sqlite:///{(data / 'ratelimit.sqlite3').as_posix()}",
+        "CHAT_RATE_LIMITS": "1000000/minute",
+        "TOKEN_BUDGET_STORAGE_URI": f"sqlite:///{(data / 'token_budget.sqlite3').as_posix()}",
+        "TOKEN_BUDGET_PER_CLIENT": "",
+        "TRACE_LOG": "0",
+    }
+    api = start_api(port, args.workers, env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        driver = Driver(base_url, args.endpoint, unique=not args.cache)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(driver.one, range(-args.concurrency, 0)))  # warm up connections
+            wait_for_outbox(base_url)
+            llm_before, email_before = len(llm.requests), len(email.requests)
+            probe = HealthProbe(base_url)
+            probe.start()
+            start = time.perf_counter()
+            samples = list(pool.map(driver.one, range(args.requests)))
+            elapsed = time.perf_counter() - start
+            health = probe.stop()
+        wait_for_outbox(base_url)
+    finally:
+        api.terminate()
+        api.wait(10)
+        llm.stop()
+        email.stop()
+        tmp.cleanup()
+
+    latencies = [s["latency"] * 1000 for s in samples if s["ok"]] or [float("nan")]
+    first_tokens = [s["first_token"] * 1000 for s in samples if s["ok"] and s["first_token"] is not None]
+    statuses: dict[str, int] = {}
+    for s in samples:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "rps": round(len(samples) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "mean": round(statistics.fmean(latencies), 1),
+        },
+        "failure_rate": round(sum(not s["ok"] for s in samples) / len(samples), 4),
+        "status_counts": statuses,
+        "health_ms": health,
+        "upstream": {
+            "llm_requests": len(llm.requests) - llm_before,
+            "emails_delivered": len(email.requests) - email_before,
+        },
+    }
+    if first_tokens:
+        results["first_token_ms"] = {"p50": round(percentile(first_tokens, 0.5), 1), "p95": round(percentile(first_tokens, 0.95), 1)}
+    return results
+
+
+def compare(current: dict, previous: dict) -> dict:
+    """Relative change of the headline numbers against an earlier result file."""
+
+    def pick(result: dict, path: str):
+        for part in path.split("."):
+            result = result.get(part, {}) if isinstance(result, dict) else {}
+        return result if isinstance(result, (int, float)) else None
+
+    changes = {"against": previous.get("commit")}
+    for path in COMPARED:
+        old, new = pick(previous, path), pick(current, path)
+        if old is not None and new is not None:
+            changes[path] = {"before": old, "after": new, "change_pct": round((new - old) / old * 100, 1) if old else None}
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the /chat pipeline against local upstream stubs.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--endpoint", choices=("chat", "stream"), default="chat")
+    parser.add_argument("--scenario", choices=tuple(SCRIPTS), default="plain")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--email-latency", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--cache", action="store_true", help="repeat messages so the response cache can answer")
+    parser.add_argument("--out", type=Path)
+    parser.add_argument("--compare", type=Path, help="earlier --out file to diff against")
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.compare:
+        results["compare"] = compare(results, json.loads(args.compare.read_text(encoding="utf-8")))
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: cold-start cost of the API.
+
+Reports (1) the heaviest direct imports of `api` and `agent_logic` from `python -X importtime`, and
+(2) time from process launch to the first healthy `/health` response and to agent readiness,
+measured by starting uvicorn in a fresh subprocess.
+
+Usage: python bench_cold_start.py [--runs 5] [--top 10] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+
+
+def import_profile(module: str, top: int) -> dict:
+    """Runs `python -X importtime -c "import <module>"` and returns total and heaviest imports (ms)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    total_us, children, pending = 0, [], []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two extra spaces per level; a package's imports are listed before it.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            pending.append((name, int(cumulative_us)))
+        elif depth == 0:
+            if name == module:
+                total_us, children = int(cumulative_us), pending
+            pending = []
+    heaviest = sorted(children, key=lambda r: r[1], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "heaviest": [{"module": name, "cumulative_ms": round(cum / 1000, 1)} for name, cum in heaviest],
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_json(url: str) -> dict | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.loads(response.read())
+    except OSError:
+        return None
+
+
+def time_to_healthy(timeout: float = 60.0) -> tuple[float, float | None]:
+    """Launches uvicorn and returns seconds until /health answers and until the agent reports ready."""
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    healthy = ready = None
+    try:
+        while time.perf_counter() - start < timeout:
+            body = get_json(f"http://127.0.0.1:{port}/health")
+            if body is not None:
+                now = time.perf_counter() - start
+                healthy = healthy or now
+                if body.get("agent_ready"):
+                    ready = now
+                    break
+            time.sleep(0.005)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    if healthy is None:
+        raise RuntimeError("Server never became healthy")
+    return healthy, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark API cold start.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    healthy, ready = [], []
+    for _ in range(args.runs):
+        h, r = time_to_healthy()
+        healthy.append(h)
+        if r is not None:
+            ready.append(r)
+
+    results = {
+        "python": sys.version.split()[0],
+        "import_api": import_profile("api", args.top),
+        "import_agent_logic": import_profile("agent_logic", args.top),
+        "runs": args.runs,
+        "first_healthy_ms_median": round(statistics.median(healthy) * 1000, 1),
+        "first_healthy_ms_max": round(max(healthy) * 1000, 1),
+        "agent_ready_ms_median": round(statistics.median(ready) * 1000, 1) if ready else None,
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: outbound email API calls with and without digest mode.
+
+Replays a burst of notifications (repeated unknown questions, repeated lead emails and a few
+high-priority leads) through `record_issue` / `record_user` and the real outbox worker and
+Notifier, delivering to a local stub of the Resend API. Reports provider calls per mode, the
+delivery delay of high-priority leads and whether every distinct notification arrived.
+
+Usage: python bench_digest.py [--events 200] [--spacing 0.01] [--window 1.0] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from local_stubs import StubEmailAPI
+from outbox import Outbox, OutboxWorker
+
+QUESTIONS = [
+    "What is your salary expectation?",
+    "Do you know Rust?",
+    "Have you used Kubernetes in production?",
+    "What's your favourite LLM?",
+    "Can you relocate to Helsinki?",
+    "Do you do freelance work on weekends?",
+]
+LEADS = [f"visitor{i}@example.com" for i in range(8)]
+
+
+def events(n: int, seed: int = 7) -> list[tuple]:
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        if i % 50 == 25:
+            out.append(("lead", f"hiring{i}@example.com", "high"))
+        elif rng.random() < 0.7:
+            question = rng.choice(QUESTIONS)
+            out.append(("question", question.upper() if rng.random() < 0.3 else question, "normal"))
+        else:
+            out.append(("lead", rng.choice(LEADS), "normal"))
+    return out
+
+
+def run_mode(agent_logic, stub: StubEmailAPI, data: Path, window: float, burst: list[tuple], spacing: float) -> dict:
+    outbox = Outbox(data / f"outbox-{window}.sqlite3")
+    worker = OutboxWorker(outbox, agent_logic.send_email, digest_window=window, digest_max_items=50)
+    agent_logic.OUTBOX, agent_logic.OUTBOX_WORKER, agent_logic.NOTIFY_DIGEST_WINDOW = outbox, worker, window
+    before = len(stub.requests)
+    high_priority = []
+
+    start = time.perf_counter()
+    for kind, value, priority in burst:
+        if kind == "lead":
+            agent_logic.record_user(value, name="Bench", notes="-", priority=priority)
+            if priority == "high":
+                high_priority.append(value)
+        else:
+            agent_logic.record_issue(value)
+        time.sleep(spacing)
+    deadline = time.monotonic() + window + 10
+    while time.monotonic() < deadline and (outbox.status()["pending"] or outbox.status()["digest_pending"]):
+        time.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    worker.stop()
+
+    delivered = stub.requests[before:]
+    text = "\n".join(r["json"]["subject"] + "\n" + r["json"]["text"] for r in delivered)
+    distinct = {(k, v.lower() if k == "question" else v) for k, v, _ in burst}
+    missing = [v for k, v in distinct if v.lower() not in text.lower()]
+    return {
+        "digest_window_s": window,
+        "notifications": len(burst),
+        "distinct_notifications": len(distinct),
+        "provider_calls": len(delivered),
+        "all_distinct_delivered": not missing,
+        "high_priority_delivered": all(email in text for email in high_priority),
+        "elapsed_s": round(elapsed, 2),
+    }
+
+
+def high_priority_delay(agent_logic, stub: StubEmailAPI, data: Path, window: float) -> float:
+    """Seconds from a high-priority lead to its arrival at the provider while digest mode is on."""
+    outbox = Outbox(data / "outbox-priority.sqlite3")
+    worker = OutboxWorker(outbox, agent_logic.send_email, digest_window=window, digest_max_items=50)
+    agent_logic.OUTBOX, agent_logic.OUTBOX_WORKER, agent_logic.NOTIFY_DIGEST_WINDOW = outbox, worker, window
+    agent_logic.record_issue("Do you know Rust?")
+    before = len(stub.requests)
+    start = time.perf_counter()
+    agent_logic.record_user("urgent@example.com", name="Urgent", priority="high")
+    while len(stub.requests) == before and time.perf_counter() - start < 10:
+        time.sleep(0.001)
+    worker.stop()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark digest-mode email API call reduction.")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--spacing", type=float, default=0.01, help="seconds between notifications")
+    parser.add_argument("--window", type=float, default=1.0)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    stub = StubEmailAPI().start()
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp)
+        os.environ.update({
+            "RESEND_URL": stub.url,
+            "RESEND_API_KEY": "bench",
+            "RECIPIENT_EMAIL": "owner@example.com",
+            "SENDGRID_API_KEY": "",
+            "OUTBOX_PATH": str(data / "outbox.sqlite3"),
+        })
+        import agent_logic
+
+        burst = events(args.events)
+        results = {
+            "immediate": run_mode(agent_logic, stub, data, 0.0, burst, args.spacing),
+            "digest": run_mode(agent_logic, stub, data, args.window, burst, args.spacing),
+            "high_priority_delay_ms": round(high_priority_delay(agent_logic, stub, data, args.window) * 1000, 1),
+        }
+        agent_logic.NOTIFIER.close()
+    stub.stop()
+    immediate, digest = results["immediate"]["provider_calls"], results["digest"]["provider_calls"]
+    results["provider_call_reduction_pct"] = round((1 - digest / immediate) * 100, 1) if immediate else None
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
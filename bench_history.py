@@ -0,0 +1,111 @@
+"""
+Benchmark: prompt-token savings and overhead of history compaction on synthetic 50-turn conversations.
+
+Usage: python bench_history.py [--turns 50] [--conversations 20] [--budget 1500] [--out results.json]
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from history import HistoryManager, count_tokens, message_tokens
+
+QUESTIONS = [
+    "What kind of multi-agent systems have you built, and which frameworks did you use for orchestration?",
+    "How did you move from structural CAD work into building AI agents?",
+    "Can you tell me more about the production AI infrastructure you deployed on AWS?",
+    "Do you work with React and Next.js for the frontend side of your projects?",
+    "What is your approach to context engineering when prompts get large?",
+    "Are you open to remote or hybrid roles in Finland?",
+]
+ANSWERS = [
+    "I've built a 6-agent sales intelligence team with CrewAI and a research team with LangGraph. "
+    "Each agent has a focused role, shared memory and tool access, and an orchestrator routes work between them.",
+    "I spent years doing structural design and CAD, which taught me precision and systems thinking. "
+    "I started automating my own workflows with Python and that grew into building agentic AI systems.",
+    "I deployed containerized agents with FastAPI behind API Gateway, with monitoring, rate limiting and "
+    "infrastructure as code so the whole stack can be rebuilt reproducibly.",
+    "Yes, I use React and Next.js for my web projects, including this portfolio and several full-stack apps.",
+    "I keep prompts lean: structured context files, retrieval for the details, and strict output contracts.",
+    "Yes, I'm flexible on remote, hybrid or in-office work anywhere in Finland.",
+]
+
+
+def synthetic_conversation(turns: int, rng: random.Random) -> list[dict[str, str]]:
+    history = []
+    for _ in range(turns):
+        i = rng.randrange(len(QUESTIONS))
+        history.append({"role": "user", "content": QUESTIONS[i]})
+        history.append({"role": "assistant", "content": ANSWERS[i]})
+    return history
+
+
+def system_prompt_tokens() -> int:
+    from agent_logic import Me
+
+    # Build the real prompt without constructing API clients.
+    agent = Me.__new__(Me)
+    agent.bio = agent._load_bio()
+    return count_tokens(agent._build_system_prompt())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    system_tokens = system_prompt_tokens()
+    manager = HistoryManager(budget_tokens=args.budget)
+    full_total = compact_total = history_full_total = history_compact_total = 0
+    final_full, final_compact, latencies_ms = [], [], []
+
+    for _ in range(args.conversations):
+        conversation = synthetic_conversation(args.turns, rng)
+        # Replay turn by turn, as the API sees it: history so far + the new message.
+        for turn in range(args.turns):
+            history = conversation[: 2 * turn]
+            msg = conversation[2 * turn]["content"]
+            start = time.perf_counter()
+            compacted = manager.compact(history, reserved_tokens=count_tokens(msg))
+            latencies_ms.append((time.perf_counter() - start) * 1000)
+            history_full = sum(map(message_tokens, history))
+            history_compact = sum(map(message_tokens, compacted))
+            history_full_total += history_full
+            history_compact_total += history_compact
+            full = system_tokens + history_full + count_tokens(msg)
+            compact = system_tokens + history_compact + count_tokens(msg)
+            full_total += full
+            compact_total += compact
+        final_full.append(full)
+        final_compact.append(compact)
+
+    latencies_ms.sort()
+    results = {
+        "turns": args.turns,
+        "conversations": args.conversations,
+        "history_budget_tokens": args.budget,
+        "system_prompt_tokens": system_tokens,
+        "last_turn_prompt_tokens_full": round(statistics.mean(final_full)),
+        "last_turn_prompt_tokens_compacted": round(statistics.mean(final_compact)),
+        "conversation_prompt_tokens_full": full_total // args.conversations,
+        "conversation_prompt_tokens_compacted": compact_total // args.conversations,
+        "history_token_savings_pct": round(100 * (1 - history_compact_total / history_full_total), 1),
+        "prompt_token_savings_pct": round(100 * (1 - compact_total / full_total), 1),
+        "compaction_latency_ms_p50": round(latencies_ms[len(latencies_ms) // 2], 3),
+        "compaction_latency_ms_p99": round(latencies_ms[int(len(latencies_ms) * 0.99)], 3),
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
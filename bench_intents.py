@@ -0,0 +1,188 @@
+"""
+Benchmark: precision, recall and latency of the local intent router on a labeled query set.
+
+Each query is labeled with the intent whose canned reply it should get, or None when it must
+reach the model (portfolio questions, questions about my own work that merely contain a
+trigger phrase, messages with contact details, other languages). Precision matters most: a wrong canned reply is worse than
+an extra model call. A few queries also carry the language the reply must be in (mixed
+English/Finnish signals); routing those in the wrong language counts as a wrong reply.
+
+Usage: python bench_intents.py [--repeat 200] [--out results.json]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from intent_router import CANNED_REPLIES, IntentRouter
+
+LABELED = [
+    # availability
+    ("Are you available for hire?", "availability"),
+    ("are u open to work?", "availability"),
+    ("Are you currently looking for a job?", "availability"),
+    ("Can we hire you for a six-month contract?", "availability"),
+    ("Are you open for new opportunities right now?", "availability"),
+    ("Are you available for work in Helsinki?", "availability"),
+    ("Are you job hunting at the moment?", "availability"),
+    ("Are you looking for a new role?", "availability"),
+    ("Oletko saatavilla töihin?", "availability"),
+    ("Oletko tällä hetkellä vapaana uusiin työtehtäviin?", "availability"),
+    ("Etsitkö töitä?", "availability"),
+    ("Voiko sinut palkata projektiin?", "availability"),
+    ("Is Sami free to start next month?", "availability"),
+    ("When could you start?", "availability"),
+    # debugging
+    ("Can you help me debug my React component?", "debugging"),
+    ("Please fix this error in my Flask app", "debugging"),
+    ("Why doesn't my code compile?", "debugging"),
+    ("Fix my script, it crashes on startup", "debugging"),
+    ("Traceback (most recent call last): File \"app.py\", line 3", "debugging"),
+    ("Could you debug this function for me?", "debugging"),
+    ("Why is my program so slow?", "debugging"),
+    ("Voitko auttaa korjaamaan koodi virheen?", "debugging"),
+    ("Miksi koodini ei toimi?", "debugging"),
+    ("My Docker build keeps failing, any idea?", "debugging"),
+    # tutorial
+    ("What's the best way to learn Python?", "tutorial"),
+    ("How do I start learning machine learning?", "tutorial"),
+    ("Teach me how to code in Rust", "tutorial"),
+    ("Give me a step-by-step tutorial on Docker", "tutorial"),
+    ("How can I learn LangChain quickly?", "tutorial"),
+    ("Show me how to build a REST API", "tutorial"),
+    ("Write me a guide to Kubernetes", "tutorial"),
+    ("Miten voin oppia ohjelmointia?", "tutorial"),
+    ("Opeta minulle Pythonia", "tutorial"),
+    ("Mikä on paras tapa oppia tekoälyä?", "tutorial"),
+    ("Explain transformers to me like I'm five", "tutorial"),
+    # unrelated
+    ("What do you think about the latest iPhone?", "unrelated"),
+    ("What's the weather today?", "unrelated"),
+    ("Give me a recipe for lasagna", "unrelated"),
+    ("Who won the Stanley Cup?", "unrelated"),
+    ("What is the capital of Australia?", "unrelated"),
+    ("What's the bitcoin price?", "unrelated"),
+    ("Tell me a joke", "unrelated"),
+    ("What's my horoscope for today?", "unrelated"),
+    ("Millainen sää on huomenna?", "unrelated"),
+    ("Kerro vitsi", "unrelated"),
+    ("Onko sinulla hyvä resepti pullaan?", "unrelated"),
+    ("Mikä on Ruotsin pääkaupunki?", "unrelated"),
+    ("Who is the best football player ever?", "unrelated"),
+    ("Recommend me a good movie", "unrelated"),
+    # language: a greeting or a name with ä/ö/å does not make an English question Finnish
+    ("Hei! Are you available for hire?", "availability", "en"),
+    ("Can we hire you for a project in Åbo?", "availability", "en"),
+    ("Are you open to work in Åbo?", "availability", "en"),
+    ("Moi, can you help me debug my code?", "debugging", "en"),
+    ("Oletko saatavilla töihin? Kiitos!", "availability", "fi"),
+    ("Hei, oletko available for hire?", None),
+    ("Etsitkö töitä? Looking for a job?", None),
+    # must reach the model
+    ("What's your background?", None),
+    ("What projects have you built?", None),
+    ("Tell me about your experience with LangGraph", None),
+    ("What tech stack do you use?", None),
+    ("How did you fix the latency problem in your RAG project?", None),
+    ("What's the best way to learn from your GitHub projects?", None),
+    ("Did you build the weather agent in your portfolio?", None),
+    ("Have you worked with the latest iPhone APIs?", None),
+    ("Tell me a joke about your projects", None),
+    ("Kerro projekteistasi", None),
+    ("Mitä teknologioita käytät?", None),
+    ("Millaista kokemusta sinulla on tekoälystä?", None),
+    ("Hi!", None),
+    ("Thanks, that was helpful", None),
+    ("My email is jane@example.com, please get in touch", None),
+    # canned-looking questions carrying a lead: the model must record it
+    ("Can I hire you? reach me at bob@x.io, we have a project", None),
+    ("Are you looking for work? I have a role at Acme, contact me at hr@acme.com", None),
+    ("Can you fix my code? email me at a@b.com", None),
+    ("Are you available for hire? Call me on +358 40 123 4567", None),
+    ("Oletko saatavilla töihin? Ota yhteyttä, sähköpostini on liisa@yritys.fi", None),
+    ("We have a project for you: an agentic support bot. Interested?", None),
+    ("What is the Saranen program?", None),
+    ("Do you know Kubernetes?", None),
+    ("How do multi-agent systems work in your sidekick project?", None),
+    ("Which LLM providers have you used?", None),
+    ("¿Estás disponible para trabajar?", None),
+    ("Är du tillgänglig för jobb?", None),
+    ("Вы доступны для работы?", None),
+    ("Bist du offen für neue Jobs?", None),
+    ("Can you explain your approach to tool calling?", None),
+    ("What are you building right now?", None),
+    ("How do I contact you?", None),
+    ("Do you have a CV I can read?", None),
+    ("Where are you based?", None),
+    ("What did you study?", None),
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def score(router: IntentRouter) -> dict:
+    predicted = []
+    wrong_language = 0
+    for text, label, *language in LABELED:
+        route = router.route(text)
+        guess = route.intent if route else None
+        if route and language and route.language != language[0]:
+            wrong_language += 1
+            guess = f"{guess} ({route.language})"
+        predicted.append((label, guess))
+    per_intent = {}
+    for intent in CANNED_REPLIES:
+        tp = sum(1 for label, guess in predicted if guess == intent and label == intent)
+        fp = sum(1 for label, guess in predicted if guess == intent and label != intent)
+        fn = sum(1 for label, guess in predicted if guess != intent and label == intent)
+        per_intent[intent] = {
+            "precision": round(tp / (tp + fp), 3) if tp + fp else None,
+            "recall": round(tp / (tp + fn), 3) if tp + fn else None,
+            "support": tp + fn,
+        }
+    routed = sum(1 for _, guess in predicted if guess)
+    wrong = sum(1 for label, guess in predicted if guess and guess != label)
+    return {
+        "queries": len(LABELED),
+        "routed": routed,
+        "wrong_canned_replies": wrong,
+        "wrong_language": wrong_language,
+        "precision": round((routed - wrong) / routed, 3) if routed else None,
+        "recall": round((routed - wrong) / sum(1 for _, label, *_ in LABELED if label), 3),
+        "per_intent": per_intent,
+    }
+
+
+def latency(router: IntentRouter, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        for text, *_ in LABELED:
+            start = time.perf_counter()
+            router.route(text)
+            samples.append(time.perf_counter() - start)
+    return {
+        "calls": len(samples),
+        "latency_us_p50": round(percentile(samples, 0.5) * 1e6, 2),
+        "latency_us_p99": round(percentile(samples, 0.99) * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local intent router.")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    router = IntentRouter()
+    results = {**score(router), **latency(router, args.repeat)}
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: cost of the request instrumentation.
+
+Times an empty `span()` (histogram observe + trace append), a full traced request shape
+(one trace, chat span, two completion spans, two tool spans, token counts) and rendering
+`/metrics` after many label combinations have been recorded.
+
+Usage: python bench_metrics.py [--n 100000] [--out results.json]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import metrics
+from metrics import CHAT_SECONDS, COMPLETION_SECONDS, REGISTRY, TOOL_SECONDS, record_tokens, span, trace
+
+
+def per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return round((time.perf_counter() - start) / n * 1e6, 3)
+
+
+def bare_span():
+    with span(TOOL_SECONDS, "tool", tool="bench"):
+        pass
+
+
+def traced_request():
+    with trace("chat"):
+        with span(CHAT_SECONDS, "chat", mode="sync"):
+            for _ in range(2):
+                with span(COMPLETION_SECONDS, "completion", model="bench") as labels:
+                    labels["model"] = "bench"
+                record_tokens("bench", 900, 120)
+            for tool in ("record_user_details", "record_unknown_question"):
+                with span(TOOL_SECONDS, "tool", tool=tool):
+                    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark instrumentation overhead.")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    metrics.LOG_TRACES = False  # measure the instrumentation, not stdout
+    results = {
+        "span_us": per_call_us(bare_span, args.n),
+        "traced_request_us": per_call_us(traced_request, args.n // 10),
+    }
+    start = time.perf_counter()
+    text = REGISTRY.render()
+    results["render_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    results["render_lines"] = text.count("\n")
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark: memory per loaded persona and first-request latency of the persona registry.
+
+Builds `--personas` persona directories from copies of `me/` (each with its own prompt
+template), then loads them one by one through `PersonaRegistry` and sends each a first chat
+request against a local fake OpenAI-compatible server. Reports:
+- memory per loaded persona (traced Python allocations, plus the RSS change on Linux),
+  next to what a private OpenAI client pair would add to each persona if clients were not
+  shared (its TLS context lives outside the Python heap, so RSS shows it and tracemalloc
+  does not);
+- first-request latency (load + chat) for a never-seen persona and for one reloaded
+  after eviction (its retrieval index is already on disk);
+- warm request latency for a loaded persona.
+
+Usage: python bench_personas.py [--personas 8] [--requests 20] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from local_stubs import FakeOpenAIServer
+
+ROOT = Path(__file__).parent
+TEMPLATE = "You ARE $name. Always answer in first person, briefly.\n\nWHO I AM:\n$bio\n"
+
+
+def make_personas(root: Path, count: int) -> list[str]:
+    ids = []
+    for i in range(count):
+        persona_id = f"persona{i}"
+        directory = root / persona_id
+        shutil.copytree(ROOT / "me", directory)
+        (directory / "prompt.tmpl").write_text(TEMPLATE.replace("$name", f"Persona {i}"), encoding="utf-8")
+        ids.append(persona_id)
+    return ids
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def ms(values: list[float]) -> dict:
+    return {
+        "p50": round(percentile(values, 0.5) * 1000, 2),
+        "max": round(max(values) * 1000, 2),
+        "mean": round(statistics.fmean(values) * 1000, 2),
+    }
+
+
+def rss_bytes() -> int | None:
+    try:
+        return int(Path("/proc/self/statm").read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory() -> tuple[int, int | None]:
+    return tracemalloc.get_traced_memory()[0], rss_bytes()
+
+
+def delta_kib(before: tuple[int, int | None], after: tuple[int, int | None]) -> dict:
+    rss = round((after[1] - before[1]) / 1024, 1) if before[1] is not None else None
+    return {"traced_kib": round((after[0] - before[0]) / 1024, 1), "rss_kib": rss}
+
+
+def client_pair_memory(count: int = 4) -> dict:
+    """Memory of OpenAI + AsyncOpenAI pairs: the per-persona cost without a shared pool."""
+    from openai import AsyncOpenAI, OpenAI
+
+    before = memory()
+    clients = [
+        (OpenAI(api_key="bench", base_url="http://127.0.0.1:1"), AsyncOpenAI(api_key="bench", base_url="http://127.0.0.1:1"))
+        for _ in range(count)
+    ]
+    after = memory()
+    del clients
+    return {k: round(v / count, 1) if v is not None else None for k, v in delta_kib(before, after).items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark persona loading and memory.")
+    parser.add_argument("--personas", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="warm requests per measured persona")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    llm = FakeOpenAIServer(latency=0.0).start()
+    tmp = tempfile.TemporaryDirectory()
+    data = Path(tmp.name)
+    os.environ.update({
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": llm.base_url,
+        "RESPONSE_CACHE_PATH": "",
+        "RETRIEVAL_INDEX_PATH": str(data / "retrieval_index.json"),
+        "OUTBOX_PATH": str(data / "outbox.sqlite3"),
+        "TOKEN_BUDGET_STORAGE_URI": "memory://",
+        "TRACE_LOG": "0",
+    })
+    import agent_logic
+    from personas import PersonaRegistry
+
+    ids = make_personas(data / "personas", args.personas)
+    registry = PersonaRegistry(
+        data / "personas",
+        factory=lambda persona_id, directory: agent_logic.Me(context_dir=directory, persona=persona_id),
+        max_loaded=args.personas,
+    )
+
+    tracemalloc.start()
+    # The default agent pays for the imports and the shared clients, as it does at API start-up.
+    default = agent_logic.Me()
+    default.chat("What's your background? (warm-up)", [])
+
+    first_request = []
+    before = memory()
+    for i, persona_id in enumerate(ids):
+        start = time.perf_counter()
+        registry.get(persona_id).chat(f"What have you built? ({i})", [])
+        first_request.append(time.perf_counter() - start)
+    loaded = delta_kib(before, memory())
+    per_persona = {k: round(v / args.personas, 1) if v is not None else None for k, v in loaded.items()}
+    private_clients = client_pair_memory()
+    tracemalloc.stop()
+
+    warm = []
+    agent = registry.get(ids[0])
+    for i in range(args.requests):
+        start = time.perf_counter()
+        agent.chat(f"Tell me about your projects ({i})", [])
+        warm.append(time.perf_counter() - start)
+
+    reload = []
+    for i, persona_id in enumerate(ids):
+        registry.unload(persona_id)
+        start = time.perf_counter()
+        registry.get(persona_id).chat(f"What have you built? (again {i})", [])
+        reload.append(time.perf_counter() - start)
+
+    results = {
+        "personas": args.personas,
+        "memory_per_persona": per_persona,
+        "private_client_pair": private_clients,
+        "first_request_ms": ms(first_request),
+        "first_request_after_eviction_ms": ms(reload),
+        "warm_request_ms": ms(warm),
+        "upstream_connections": llm.connections,
+        "registry": registry.stats(),
+    }
+    llm.stop()
+    tmp.cleanup()
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: per-request overhead of the rate-limit storage under concurrent load.
+
+Several processes (standing in for uvicorn/gunicorn workers) hammer one limit key through
+`limits`' fixed-window strategy, as slowapi does. Reports per-hit latency for the in-process
+memory storage and the shared SQLite storage, and checks that the shared storage admits
+exactly the configured number of hits across all workers.
+
+Usage: python bench_rate_limit.py [--workers 4] [--threads 4] [--hits 500] [--out results.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from limits import RateLimitItemPerDay
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+import rate_limit_store  # noqa: F401  (registers sqlite://)
+
+
+def worker(uri: str, limit: int, threads: int, hits: int, queue) -> None:
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerDay(limit)
+    latencies, allowed = [], [0]
+    lock = threading.Lock()
+
+    def run(thread_id: int):
+        own, admitted = [], 0
+        for i in range(hits):
+            # Half the traffic shares one key (a busy client), half is spread over many keys.
+            key = "shared" if i % 2 == 0 else f"client-{thread_id}-{i % 50}"
+            start = time.perf_counter()
+            ok = limiter.hit(item, key)
+            own.append(time.perf_counter() - start)
+            admitted += ok and key == "shared"
+        with lock:
+            latencies.extend(own)
+            allowed[0] += admitted
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    queue.put((latencies, allowed[0]))
+
+
+def measure(uri: str, workers: int, threads: int, hits: int, limit: int) -> dict:
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(uri, limit, threads, hits, queue)) for _ in range(workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(l for lat, _ in results for l in lat)
+    admitted = sum(a for _, a in results)
+    return {
+        "storage": uri.split(":")[0],
+        "hits": len(latencies),
+        "hits_per_s": round(len(latencies) / elapsed),
+        "latency_us_p50": round(latencies[len(latencies) // 2] * 1e6, 1),
+        "latency_us_p99": round(latencies[int(len(latencies) * 0.99)] * 1e6, 1),
+        "shared_key_limit": limit,
+        "shared_key_admitted": admitted,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rate-limit storage overhead.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--hits", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            measure("memory://", args.workers, args.threads, args.hits, args.limit),
+            measure(f"sqlite:///{(Path(tmp) / 'ratelimit.sqlite3').as_posix()}", args.workers, args.threads, args.hits, args.limit),
+        ]
+    # With per-process memory storage every worker admits its own `limit`; shared storage admits it once.
+    print(json.dumps({"workers": args.workers, "threads_per_worker": args.threads, "results": results}, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: retrieval latency and prompt-token reduction of the BM25 index versus inlining the full bio.
+
+Usage: python bench_retrieval.py [--top-k 4] [--repeat 200] [--out results.json]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from history import count_tokens
+from retrieval import RetrievalIndex
+
+BASE_DIR = Path(__file__).parent / "me"
+
+QUERIES = [
+    "Are you available for hire?",
+    "What's your background?",
+    "Can you show me your work?",
+    "What multi-agent systems have you built with LangGraph or CrewAI?",
+    "Do you have experience deploying on AWS?",
+    "Tell me about the Sidekick project",
+    "What tech is this website built with?",
+    "Which programming languages do you use?",
+    "Oletko saatavilla töihin?",
+    "hi",
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    from agent_logic import Me
+
+    # Build prompts without constructing API clients.
+    agent = Me.__new__(Me)
+    agent.bio = agent._load_bio()
+    agent.system_prompt = agent._build_system_prompt()
+    agent.retrieval_top_k = args.top_k
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "me"
+        shutil.copytree(BASE_DIR, source)
+        index_path = Path(tmp) / "index.json"
+
+        start = time.perf_counter()
+        agent.index = RetrievalIndex(source, index_path)
+        cold_build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        RetrievalIndex(source, index_path)
+        warm_load_ms = (time.perf_counter() - start) * 1000
+
+        edited = source / "portfolio.txt"
+        edited.write_text(edited.read_text(encoding="utf-8") + "\n\n### New project\nA freshly added project.\n", encoding="utf-8")
+        start = time.perf_counter()
+        changed = agent.index.refresh()
+        incremental_ms = (time.perf_counter() - start) * 1000
+
+        latencies_ms, full_tokens, retrieval_tokens = [], [], []
+        for query in QUERIES:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                agent.index.search(query, args.top_k)
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+            full_tokens.append(count_tokens(agent.system_prompt))
+            retrieval_tokens.append(count_tokens(agent.prompt_for(query, [])))
+
+    results = {
+        "chunks": agent.index.chunk_count,
+        "top_k": args.top_k,
+        "index_cold_build_ms": round(cold_build_ms, 2),
+        "index_warm_load_ms": round(warm_load_ms, 2),
+        "index_incremental_refresh_ms": round(incremental_ms, 2),
+        "incremental_files_reindexed": changed,
+        "search_latency_ms_p50": round(percentile(latencies_ms, 0.5), 4),
+        "search_latency_ms_p99": round(percentile(latencies_ms, 0.99), 4),
+        "prompt_tokens_full_bio": round(statistics.mean(full_tokens)),
+        "prompt_tokens_retrieval_mean": round(statistics.mean(retrieval_tokens)),
+        "prompt_tokens_retrieval_max": max(retrieval_tokens),
+        "prompt_token_reduction_pct": round(100 * (1 - sum(retrieval_tokens) / sum(full_tokens)), 1),
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
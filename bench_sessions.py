@@ -0,0 +1,96 @@
+"""
+Benchmark: request size and API-side latency of stateless history mode versus session mode.
+
+Replays 25-turn conversations through `/chat` with the agent replaced by an instant fake, so
+the numbers cover only what the API layer does per request: parsing and validating the body,
+loading/saving the session and serializing the reply.
+
+Usage: python bench_sessions.py [--conversations 20] [--turns 25] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("RATE_LIMIT_STORAGE_URI", "memory://")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+from sessions import SessionStore  # noqa: E402
+
+QUESTION = "Can you tell me more about the multi-agent systems you have built and how you deployed them?"
+REPLY = (
+    "I've built several multi-agent systems with LangGraph and CrewAI: a research assistant that plans, "
+    "searches and writes reports, and a sidekick agent that browses and evaluates its own work. "
+) * 3
+
+
+class InstantAgent:
+    def chat(self, msg, history):
+        return REPLY
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_mode(client: TestClient, mode: str, conversations: int, turns: int) -> dict:
+    sizes, latencies = [], []
+    for c in range(conversations):
+        history, session_id = [], "new"
+        for t in range(turns):
+            body = {"message": f"{QUESTION} ({c}.{t})"}
+            if mode == "stateless":
+                body["history"] = history[-api.MAX_HISTORY_MESSAGES:]
+            else:
+                body["session_id"] = session_id
+            payload = json.dumps(body).encode()
+            start = time.perf_counter()
+            response = client.post("/chat", content=payload, headers={"Content-Type": "application/json"})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+            sizes.append(len(payload))
+            reply = response.json()
+            session_id = reply.get("session_id", session_id)
+            history += [{"role": "user", "content": body["message"]}, {"role": "assistant", "content": reply["reply"]}]
+    return {
+        "requests": len(sizes),
+        "request_bytes_mean": round(statistics.fmean(sizes)),
+        "request_bytes_last_turn": sizes[turns - 1],
+        "latency_ms_p50": round(percentile(latencies, 0.5) * 1000, 3),
+        "latency_ms_p99": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stateless vs session chat mode.")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=25)
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    api.my_agent = InstantAgent()
+    api._agent_ready.set()
+    api.limiter.enabled = False
+    client = TestClient(api.app)
+
+    results = {"stateless": run_mode(client, "stateless", args.conversations, args.turns)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, path in (("session_memory", None), ("session_sqlite", Path(tmp) / "sessions.sqlite3")):
+            api.SESSIONS = SessionStore(max_messages=api.MAX_HISTORY_MESSAGES, path=path)
+            results[name] = run_mode(client, "session", args.conversations, args.turns)
+            stats = api.SESSIONS.stats()
+            results[name]["stored_bytes_per_session"] = stats["bytes"] // max(1, stats["sessions"])
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
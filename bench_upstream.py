@@ -0,0 +1,92 @@
+"""
+Benchmark: first-request, steady-state and after-idle completion latency with the default
+OpenAI client transport versus the shared, pre-warmed `UpstreamPool`.
+
+Both clients talk to a local fake OpenAI-compatible server whose `--connect-delay` stands in
+for DNS + TCP + TLS setup to openrouter.ai. The default transport opens its first connection
+on the first request and drops idle connections after httpx's 5 s keep-alive expiry, so
+`--idle` (default 6 s) makes it reconnect; the pool is warmed before the first request and
+keeps connections for `UPSTREAM_KEEPALIVE_EXPIRY`.
+
+Usage: python bench_upstream.py [--requests 50] [--connect-delay 0.15] [--latency 0.02]
+                                [--idle 6] [--out results.json]
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from local_stubs import FakeOpenAIServer
+from upstream_pool import UpstreamPool
+
+MESSAGES = [{"role": "user", "content": "What's your background?"}]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def timed(client) -> float:
+    start = time.perf_counter()
+    client.chat.completions.create(model="openai/gpt-4o-mini", messages=MESSAGES, timeout=30.0)
+    return time.perf_counter() - start
+
+
+def run_mode(mode: str, args) -> dict:
+    from openai import OpenAI
+
+    server = FakeOpenAIServer(connect_delay=args.connect_delay, latency=args.latency).start()
+    pool = None
+    try:
+        if mode == "tuned":
+            pool = UpstreamPool(server.base_url)
+            client = OpenAI(api_key="bench", base_url=server.base_url, http_client=pool.client)
+            warm_up = pool.warm()
+        else:
+            client = OpenAI(api_key="bench", base_url=server.base_url)
+            warm_up = None
+
+        first = timed(client)
+        steady = [timed(client) for _ in range(args.requests)]
+        time.sleep(args.idle)
+        after_idle = timed(client)
+        return {
+            "warm_up_ms": round(warm_up * 1000, 1) if warm_up is not None else None,
+            "first_request_ms": round(first * 1000, 1),
+            "steady_state_ms": {
+                "p50": round(percentile(steady, 0.5) * 1000, 2),
+                "p99": round(percentile(steady, 0.99) * 1000, 2),
+                "mean": round(statistics.fmean(steady) * 1000, 2),
+            },
+            "after_idle_ms": round(after_idle * 1000, 1),
+            "connections_opened": server.connections,
+            "http2": pool.http2 if pool else False,
+        }
+    finally:
+        if pool:
+            pool.close()
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the default vs the tuned, pre-warmed upstream transport.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--connect-delay", type=float, default=0.15, help="simulated DNS + TCP + TLS setup, seconds")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated model latency, seconds")
+    parser.add_argument("--idle", type=float, default=6.0, help="quiet period before the last request, seconds")
+    parser.add_argument("--out", type=Path)
+    args = parser.parse_args()
+
+    results = {"config": {k: v for k, v in vars(args).items() if k != "out"}}
+    for mode in ("default", "tuned"):
+        results[mode] = run_mode(mode, args)
+    print(json.dumps(results, indent=2))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Keeps tests off the service's runtime state in data/.
+
+agent_logic and api open their stores when imported, so the paths are set here, before any
+test module imports them.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+_STATE_DIR = tempfile.TemporaryDirectory(prefix="test-state-")
+_state = Path(_STATE_DIR.name)
+
+os.environ.update(
+    {
+        "OUTBOX_PATH": str(_state / "outbox.sqlite3"),
+        "RESPONSE_CACHE_PATH": str(_state / "response_cache.sqlite3"),
+        "RETRIEVAL_INDEX_PATH": str(_state / "retrieval_index.json"),
+        "SESSION_STORE_PATH": str(_state / "sessions.sqlite3"),
+        "TOKEN_BUDGET_STORAGE_URI": "memory://",
+        "RATE_LIMIT_STORAGE_URI": "memory://",
+    }
+)
+
+
+def pytest_unconfigure(config):
+    _STATE_DIR.cleanup()
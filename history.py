@@ -0,0 +1,149 @@
+import hashlib
+import json
+import math
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+# Per-message overhead of the chat format (role, separators), as documented by OpenAI.
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation (older turns folded to save space):\n"
+
+_WORDS = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+# Set by load_encoding() at start-up; until then (and by default) token counts are estimated.
+_encoding = None
+
+
+def load_encoding(name: str = "o200k_base") -> bool:
+    """Switches token counting to tiktoken; returns False (keeping estimates) if it is unavailable.
+
+    tiktoken downloads the BPE data on first use unless it is in TIKTOKEN_CACHE_DIR, so call
+    this at start-up, never on a request path.
+    """
+    global _encoding
+    try:
+        import tiktoken
+
+        _encoding = tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"tiktoken unavailable, using estimated token counts ({type(e).__name__})")
+        return False
+    return True
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens locally: a close estimate, or exactly with tiktoken once `load_encoding()` succeeded."""
+    if not text:
+        return 0
+    encoding = _encoding
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # BPE vocabularies cover about four characters of an English word per token.
+    return sum(max(1, math.ceil(len(w) / 4)) for w in _WORDS.findall(text))
+
+
+def message_tokens(message: dict[str, Any]) -> int:
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content") or "")
+
+
+def extractive_summary(previous: str, messages: list[dict[str, Any]], max_chars: int = 160) -> str:
+    """Default summarizer: appends the first sentence of each folded message to the running summary."""
+    lines = [previous] if previous else []
+    for m in messages:
+        content = " ".join((m.get("content") or "").split())
+        first = _SENTENCE_END.split(content, maxsplit=1)[0]
+        if len(first) > max_chars:
+            first = first[: max_chars - 1].rstrip() + "…"
+        lines.append(f"- {m.get('role', 'user')}: {first}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """Keeps conversation history within a token budget.
+
+    The newest messages are kept verbatim; older ones are folded into a rolling
+    summary. Summaries are cached by a chained hash of the folded prefix, so the
+    next turn of the same conversation only summarizes the newly folded messages.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = 1500,
+        summary_tokens: int = 300,
+        min_recent: int = 2,
+        summarizer: Callable[[str, list[dict[str, Any]]], str] = extractive_summary,
+        max_cached: int = 512,
+    ):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.min_recent = min_recent
+        self.summarizer = summarizer
+        self.max_cached = max_cached
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _prefix_hashes(messages: list[dict[str, Any]]) -> list[str]:
+        """hashes[i] identifies messages[:i + 1]; each hash chains the previous one."""
+        hashes, h = [], ""
+        for m in messages:
+            payload = json.dumps([h, m.get("role"), m.get("content")], ensure_ascii=False)
+            h = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+            hashes.append(h)
+        return hashes
+
+    def _trim_summary(self, summary: str) -> str:
+        """Drops the oldest summary lines until it fits the summary budget."""
+        lines = summary.split("\n")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def _summarize(self, folded: list[dict[str, Any]]) -> str:
+        hashes = self._prefix_hashes(folded)
+        with self._lock:
+            start, summary = 0, ""
+            for i in range(len(hashes) - 1, -1, -1):
+                if hashes[i] in self._summaries:
+                    start, summary = i + 1, self._summaries[hashes[i]]
+                    self._summaries.move_to_end(hashes[i])
+                    break
+        if start < len(folded):
+            summary = self._trim_summary(self.summarizer(summary, folded[start:]))
+            with self._lock:
+                self._summaries[hashes[-1]] = summary
+                while len(self._summaries) > self.max_cached:
+                    self._summaries.popitem(last=False)
+        return summary
+
+    def compact(self, history: list[dict[str, Any]], reserved_tokens: int = 0) -> list[dict[str, Any]]:
+        """Returns history that fits in the budget minus `reserved_tokens` (e.g. the new user message)."""
+        budget = self.budget_tokens - reserved_tokens
+        sizes = [message_tokens(m) for m in history]
+        if sum(sizes) <= budget:
+            return history
+
+        # Keep the newest messages that fit next to a full-size summary.
+        keep_budget = budget - self.summary_tokens - MESSAGE_OVERHEAD_TOKENS
+        keep, used = 0, 0
+        for size in reversed(sizes):
+            if keep >= self.min_recent and used + size > keep_budget:
+                break
+            keep += 1
+            used += size
+        split = len(history) - keep
+        # Never start the verbatim tail on an assistant reply or orphaned tool result.
+        while split < len(history) and history[split].get("role") != "user":
+            split += 1
+
+        folded, recent = history[:split], history[split:]
+        if not folded:
+            return recent
+        summary = self._summarize(folded)
+        return [{"role": "system", "content": SUMMARY_PREFIX + summary}] + recent
+
+    def cache_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"cached_summaries": len(self._summaries)}
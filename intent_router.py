@@ -0,0 +1,174 @@
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+# Prescribed replies, shared with the system prompt so the model and the router say the same thing.
+CANNED_REPLIES = {
+    "availability": {
+        "en": "Yes! I've recently been pre-selected for the Saranen Future Skills Academy recruitment training program. I'm currently looking for an innovative company to partner with for this program—specifically roles focusing on Agentic AI or Technical Architecture. I'm flexible on remote/hybrid work and ready to start. Want to discuss a potential partnership? Email me at samrude1@outlook.com.",
+        "fi": "Kyllä! Minut on juuri esivalittu Saranen Future Skills Academyn rekrytointikoulutukseen. Etsin nyt innovatiivista yritystä kumppaniksi tähän ohjelmaan – erityisesti Agentic AI- tai teknisen arkkitehtuurin rooleihin. Olen joustava etä- ja hybridityön suhteen ja valmis aloittamaan. Haluatko keskustella yhteistyöstä? Laita sähköpostia osoitteeseen samrude1@outlook.com.",
+    },
+    "debugging": {
+        "en": "I can't debug code in this chat, but if you need help with a project, reach out via email and we can discuss.",
+        "fi": "En pysty debuggaamaan koodia tässä chatissa, mutta jos tarvitset apua projektin kanssa, laita sähköpostia osoitteeseen samrude1@outlook.com, niin jutellaan.",
+    },
+    "tutorial": {
+        "en": "I'm not a tutorial bot—I'm here to showcase my portfolio. Check out my GitHub for examples of my work, or email me if you want to collaborate.",
+        "fi": "En ole tutoriaalibotti – olen täällä esittelemässä portfoliotani. Katso GitHubistani esimerkkejä työstäni tai laita sähköpostia, jos haluat tehdä yhteistyötä.",
+    },
+    "unrelated": {
+        "en": "That's outside my scope—I'm here to talk about my AI development work and projects. What would you like to know about what I build?",
+        "fi": "Se on aihepiirini ulkopuolella – olen täällä kertomassa tekoälykehitystyöstäni ja projekteistani. Mitä haluaisit tietää siitä, mitä rakennan?",
+    },
+}
+
+
+def _compile(*patterns: str) -> re.Pattern:
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+
+# Each intent fires only on phrasings that leave little doubt; anything else goes to the model.
+RULES = {
+    "availability": _compile(
+        r"\b(are|r) (you|u) (currently )?(available|open) (for|to) (hire|hiring|work|new (roles|opportunities)|opportunities|offers|a job)\b",
+        r"\b(are|r) (you|u) (currently )?(looking|searching) for (work|a job|jobs|employment|opportunities|a (new )?role)\b",
+        r"\bcan (i|we) hire (you|u)\b",
+        r"\b(are|r) (you|u) (currently )?(job ?hunting|hireable)\b",
+        r"\boletko (nyt |tällä hetkellä )?(saatavilla|vapaana|käytettävissä|avoin) (töihin|työhön|työtehtäviin|rekrytoitavaksi|uusille)",
+        r"\betsitkö (nyt |tällä hetkellä )?(töitä|työtä|työpaikkaa)\b",
+        r"\bvoi(ko|mmeko|nko) (sinut|teidät) palkata\b",
+    ),
+    "debugging": _compile(
+        r"\b(help me|can you|could you|please) (debug|fix) (my|this|our)\b",
+        r"\b(debug|fix) (my|this) (code|script|program|bug|error|function|app|component)\b",
+        r"\bwhy (does|is|isn't|doesn't) my (code|script|program|function|app|component)\b",
+        r"\btraceback \(most recent call last\)",
+        r"\b(auta|autatko|voitko|voisitko) (minua )?(debug+aamaan|debug+ata|korjaamaan|korjata) (koodi|tämä|tätä|ohjelma|bugi)",
+        r"\bmiksi (koodini|ohjelmani|skriptini)\b",
+    ),
+    "tutorial": _compile(
+        r"\bwhat('?s| is) the best way to learn\b",
+        r"\bhow (do|can|should) i (start )?(learn|learning)\b",
+        r"\b(teach|show) me how to (code|program|write|build|use|learn)\b",
+        r"\b(give|write) me a (step[- ]by[- ]step )?(tutorial|guide|course)\b",
+        r"\bmiten (voin )?(opin|oppia|opettelen|opetella)\b",
+        r"\bopeta (minulle|mulle)\b",
+        r"\bparas tapa oppia\b",
+    ),
+    "unrelated": _compile(
+        r"\b(latest|new) iphone\b",
+        r"\bweather (today|tomorrow|in|like|forecast)\b",
+        r"\b(a |any )?(recipe|recipes) for\b",
+        r"\bwho (won|will win) the\b",
+        r"\b(what is|what's) the capital of\b",
+        r"\b(bitcoin|stock|crypto) price\b",
+        r"\btell me a joke\b",
+        r"\b(my )?horoscope\b",
+        r"\bmillainen (sää|keli)\b",
+        r"\bkerro (minulle )?vitsi\b",
+        r"\bresepti\b",
+        r"\bmikä on .+ pääkaupunki\b",
+    ),
+}
+
+# Mentions of the portfolio owner's own work mean the visitor is asking about me, not off-topic.
+GUARD = _compile(
+    r"\b(your|you've|you have|did you|have you|sinun|sinulla|olet(ko)? tehnyt|portfolio|project|projekti|experience|kokemus)",
+)
+
+# Contact details must reach the model, which records the lead (record_user_details) before answering.
+CONTACT = _compile(
+    r"[\w.+-]+@[\w-]+(\.[\w-]+)+",
+    r"(?<![\w.])\+?\d[\d ()./-]{6,}\d",
+    r"\b(reach|contact|email|e-mail|call|text|ping) me\b",
+    r"\bmy (email|e-mail|mail|phone|number|linkedin)\b",
+    r"\b(ota|ottakaa) yhteyttä\b",
+    r"\b(sähköpostini|sähköpostiosoitteeni|puhelinnumeroni|numeroni)\b",
+)
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+# Common Finnish function words and question forms; `-ko/-kö` covers the rest of the yes/no questions.
+_FINNISH = re.compile(
+    r"(oletko|olet|onko|mitä|mikä|miten|miksi|missä|kuka|kuinka|voitko|voisitko|etsitkö|kerro|minulle|mulle"
+    r"|minua|minä|sinut|sinun|sinulla|sinä|kiitos|hei|moi|ja|ei|että|tai|mutta|kanssa|haluan|tarvitsen|\w+k[oö])",
+    re.IGNORECASE,
+)
+# "on" is left out: it is just as common in Finnish.
+_ENGLISH = re.compile(
+    r"(are|is|was|be|do|does|did|can|could|would|will|should|have|has|you|your|u|i|i'm|me|my|we|our|the|a|an"
+    r"|to|for|of|in|at|with|and|or|but|what|what's|how|why|who|where|when|which|this|that|it|about|any|there)",
+    re.IGNORECASE,
+)
+# Letters outside English/Finnish mean another language: let the model handle those.
+_OTHER_SCRIPT = re.compile(r"[^\x00-\x7fäöåÄÖÅ–—’‘“”…]")
+
+
+def detect_language(text: str) -> str | None:
+    """'fi', 'en', or None when the text looks like neither or mixes both.
+
+    Finnish needs a clear majority of the recognised words (Finnish function words or words
+    with ä/ö/å), so one greeting or a name like "Jörg" in an English question stays English.
+    """
+    if _OTHER_SCRIPT.search(text):
+        return None
+    finnish = english = 0
+    for word in _WORD.findall(text.replace("’", "'")):
+        if _FINNISH.fullmatch(word) or any(c in "äöåÄÖÅ" for c in word):
+            finnish += 1
+        elif _ENGLISH.fullmatch(word):
+            english += 1
+    if finnish == 0 or 2 * finnish <= english:
+        return "en"
+    if english == 0 or finnish >= 3 * english:
+        return "fi"
+    return None
+
+
+@dataclass
+class Route:
+    intent: str
+    language: str
+    reply: str
+    confidence: float
+
+
+class IntentRouter:
+    """Answers canned and off-topic queries locally; returns None to fall through to the LLM.
+
+    Rules are tried first. An optional offline `classifier(text) -> (intent, probability)` is
+    consulted only when no rule fires, and its answer is used at `min_confidence` or above.
+    Long messages always fall through: they rarely want a one-line canned answer. So do
+    messages with contact details, so the model can record the lead.
+    """
+
+    def __init__(
+        self,
+        classifier: Callable[[str], tuple[str | None, float]] | None = None,
+        min_confidence: float = 0.9,
+        max_chars: int = 300,
+    ):
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.max_chars = max_chars
+
+    def classify(self, text: str) -> tuple[str | None, float]:
+        if len(text) > self.max_chars or CONTACT.search(text):
+            return None, 0.0
+        matched = [intent for intent, rule in RULES.items() if rule.search(text)]
+        if len(matched) == 1:
+            # Availability questions naturally say "you"; the guard only protects the off-topic intents.
+            if matched[0] == "availability" or not GUARD.search(text):
+                return matched[0], 1.0
+            return None, 0.0
+        if matched or self.classifier is None:
+            return None, 0.0
+        return self.classifier(text)
+
+    def route(self, text: str) -> Route | None:
+        language = detect_language(text)
+        if language is None:
+            return None
+        intent, confidence = self.classify(text)
+        if intent not in CANNED_REPLIES or confidence < self.min_confidence:
+            return None
+        return Route(intent, language, CANNED_REPLIES[intent][language], confidence)
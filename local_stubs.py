@@ -0,0 +1,254 @@
+"""
+Local stand-ins for the upstream services (OpenAI-compatible API, email providers, SMTP) used by
+tests and benchmarks. Each server runs on 127.0.0.1 in a daemon thread and can simulate latency,
+errors and connection setup cost.
+"""
+
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StubServerMixin:
+    """Counts accepted connections and optionally delays each one to mimic DNS/TCP/TLS setup."""
+
+    connect_delay = 0.0
+
+    def start(self):
+        self.connections = 0
+        self.requests = []
+        self._counter_lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def get_request(self):
+        conn, addr = super().get_request()
+        with self._counter_lock:
+            self.connections += 1
+        return conn, addr
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+class _EmailAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        time.sleep(self.server.connect_delay)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.server.requests.append({"path": self.path, "json": payload})
+        time.sleep(self.server.response_delay)
+        status = self.server.status_code
+        data = json.dumps({"id": f"stub-{len(self.server.requests)}"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubEmailAPI(_StubServerMixin, ThreadingHTTPServer):
+    """Keep-alive HTTP server answering Resend/SendGrid style POSTs."""
+
+    daemon_threads = True
+
+    def __init__(self, connect_delay: float = 0.0, response_delay: float = 0.0, status_code: int = 202):
+        super().__init__(("127.0.0.1", 0), _EmailAPIHandler)
+        self.connect_delay = connect_delay
+        self.response_delay = response_delay
+        self.status_code = status_code
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/emails"
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def _reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        # Connection setup and login are the expensive part of a real SMTP session.
+        time.sleep(self.server.connect_delay)
+        self._reply("220 stub ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-stub\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command.startswith("AUTH"):
+                time.sleep(self.server.connect_delay)
+                self.server.logins += 1
+                self._reply("235 Authentication successful")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while (data_line := self.rfile.readline()) not in (b".\r\n", b""):
+                    lines.append(data_line)
+                self.server.requests.append(b"".join(lines).decode(errors="replace"))
+                self._reply("250 OK queued")
+                if self.server.drop_after_message:
+                    return
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class StubSMTPServer(_StubServerMixin, socketserver.ThreadingTCPServer):
+    """Minimal plaintext SMTP server accepting any AUTH and message."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_delay: float = 0.0, drop_after_message: bool = False):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.connect_delay = connect_delay
+        self.drop_after_message = drop_after_message
+        self.logins = 0
+
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        time.sleep(self.server.connect_delay)
+
+    def do_HEAD(self):
+        """Answers keep-alive pings without touching the completion counters."""
+        self.server.pings += 1
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _chunk(self, model: str, delta: dict, finish_reason: str | None = None, usage: dict | None = None) -> bytes:
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            chunk["usage"] = usage
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+    @staticmethod
+    def _step(behaviour: dict, messages: list[dict]) -> dict:
+        """Picks the scripted turn: one step per assistant message since the last user message."""
+        script = behaviour.get("script")
+        if not script:
+            return {}
+        last_user = max((i for i, m in enumerate(messages) if m.get("role") == "user"), default=-1)
+        step = sum(1 for m in messages[last_user + 1:] if m.get("role") == "assistant")
+        return script[min(step, len(script) - 1)]
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = body.get("model", "")
+        behaviour = {**self.server.default, **self.server.models.get(model, {})}
+        self.server.requests.append(body)
+        behaviour = {**behaviour, **self._step(behaviour, body.get("messages", []))}
+        time.sleep(behaviour.get("latency", 0.0))
+        if behaviour.get("status", 200) != 200:
+            self._send_json(behaviour["status"], {"error": {"message": f"injected failure for {model}"}})
+            return
+
+        reply = behaviour.get("reply") or f"reply from {model}"
+        tool_calls = [
+            {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+            }
+            for i, call in enumerate(behaviour.get("tool_calls") or [])
+        ]
+        completion_tokens = 0 if tool_calls else len(reply.split(" "))
+        usage = {"prompt_tokens": 10, "completion_tokens": completion_tokens, "total_tokens": 10 + completion_tokens}
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": None, "tool_calls": tool_calls} if tool_calls else {
+                "role": "assistant", "content": reply}
+            self._send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        if tool_calls:
+            delta = {"tool_calls": [{"index": i, **tc} for i, tc in enumerate(tool_calls)]}
+            self.wfile.write(self._chunk(model, delta, "tool_calls"))
+        else:
+            for i, word in enumerate(reply.split(" ")):
+                self.wfile.write(self._chunk(model, {"content": word if i == 0 else f" {word}"}))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self.wfile.write(self._chunk(model, {}, usage=usage))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeOpenAIServer(_StubServerMixin, ThreadingHTTPServer):
+    """OpenAI-compatible `/chat/completions` endpoint with per-model latency and error injection.
+
+    `models` maps a model name to behaviour overrides: `latency` (seconds), `status`
+    (non-200 returns an error), `reply` (assistant text, streamed word by word when
+    the request sets `stream`), `tool_calls` (a list of `{"name", "arguments"}` to return
+    instead of text) and `script` (a list of such overrides, one per assistant round of the
+    current user turn, the last one repeating). `connect_delay` is added to every new
+    connection; HEAD requests (keep-alive pings) are counted in `pings`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, models: dict[str, dict] | None = None, connect_delay: float = 0.0, **default):
+        super().__init__(("127.0.0.1", 0), _OpenAIHandler)
+        self.models = models or {}
+        self.default = default
+        self.connect_delay = connect_delay
+        self.pings = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
@@ -0,0 +1,246 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+# Set TRACE_LOG=0 to stop printing one JSON line per traced request.
+LOG_TRACES = os.getenv("TRACE_LOG", "1") != "0"
+
+# Latency buckets in seconds, from a cache hit to a slow multi-tool turn.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_str(labelnames: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self.values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield f"{self.name}{_label_str(self.labelnames, key)} {_format(value)}"
+
+
+class Gauge(Counter):
+    """Value that goes up and down, such as a queue depth."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self.values[key] = value
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels (Prometheus cumulative-bucket semantics)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum, count]
+        self.values: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        entry = self.values.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return entry[2] if entry else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self.values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, float("inf")), counts):
+                cumulative += n
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_format(bound)}"'
+                yield f"{self.name}_bucket{_label_str(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_str(self.labelnames, key)} {_format(total)}"
+            yield f"{self.name}_count{_label_str(self.labelnames, key)} {count}"
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self.metrics: dict[str, Counter | Gauge | Histogram] = {}
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CHAT_SECONDS = REGISTRY.histogram("chat_request_seconds", "End-to-end agent time per chat request.", ("mode", "outcome"))
+CHAT_ITERATIONS = REGISTRY.histogram("chat_iterations", "Completion rounds per chat request.", ("mode",), buckets=(1, 2, 3, 4, 5))
+COMPLETION_SECONDS = REGISTRY.histogram("llm_completion_seconds", "Time per completion call, including hedging.", ("model", "outcome"))
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens reported by the model API.", ("model", "kind"))
+TOOL_SECONDS = REGISTRY.histogram("tool_call_seconds", "Time per tool call.", ("tool", "outcome"))
+EMAIL_SECONDS = REGISTRY.histogram("email_send_seconds", "Time per email provider attempt.", ("provider", "outcome"))
+CHAT_COALESCED = REGISTRY.counter(
+    "chat_coalesced_total", "Chat requests answered by an identical in-flight request instead of their own upstream calls.", ("mode",)
+)
+INTENT_ROUTED = REGISTRY.counter(
+    "intent_routed_total", "Chat requests answered by the local intent router without a model call.", ("intent", "language")
+)
+TOKEN_BUDGET_ACTIONS = REGISTRY.counter(
+    "token_budget_actions_total", "Chat requests trimmed or rejected to stay within a token budget.", ("action", "scope")
+)
+ADMISSION_ACTIVE = REGISTRY.gauge("chat_admission_active", "Chat requests currently holding an admission slot.")
+ADMISSION_QUEUED = REGISTRY.gauge("chat_admission_queue_depth", "Chat requests waiting for an admission slot.")
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "chat_admission_wait_seconds", "Time chat requests waited for an admission slot.", ("outcome",)
+)
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP request duration by route.", ("method", "route", "status"))
+
+
+# --- Per-request traces ---
+
+class Trace:
+    """Spans recorded while handling one request (kept only for that request's log line)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: list[dict[str, Any]] = []
+        self.attrs: dict[str, Any] = {}
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "trace": self.name,
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            **self.attrs,
+            "spans": self.spans,
+        }
+
+
+_current_trace: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Trace]:
+    """Makes a new Trace current for the enclosed block and logs its summary on exit.
+
+    Work handed to threads sees the trace only if submitted through `contextvars.copy_context().run`.
+    """
+    t = Trace(name)
+    token = _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # An abandoned streaming generator can be closed from another context.
+            _current_trace.set(None)
+        if LOG_TRACES:
+            print(json.dumps(t.summary(), ensure_ascii=False))
+
+
+def record_tokens(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Adds one completion's reported token usage to the counters and the current trace."""
+    LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+    t = _current_trace.get()
+    if t is not None:
+        t.attrs["prompt_tokens"] = t.attrs.get("prompt_tokens", 0) + prompt_tokens
+        t.attrs["completion_tokens"] = t.attrs.get("completion_tokens", 0) + completion_tokens
+
+
+@contextmanager
+def span(histogram: Histogram, name: str, **labels: Any) -> Iterator[dict[str, Any]]:
+    """Times the block into `histogram` and the current trace.
+
+    Yields the label dict so the block can fill in labels known only at the end (e.g. the
+    winning model); `outcome` defaults to "ok", or "error" if the block raises.
+    """
+    labels.setdefault("outcome", None)
+    started = time.perf_counter()
+    try:
+        yield labels
+    except BaseException as e:
+        # GeneratorExit / CancelledError mean the caller went away, not that the work failed.
+        labels["outcome"] = labels["outcome"] or ("error" if isinstance(e, Exception) else "cancelled")
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        labels["outcome"] = labels["outcome"] or "ok"
+        histogram.observe(elapsed, **labels)
+        t = _current_trace.get()
+        if t is not None:
+            t.spans.append({"span": name, "ms": round(elapsed * 1000, 1), **labels})
@@ -0,0 +1,261 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets one trial through after `reset_timeout`."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Frees the half-open trial slot when a call was abandoned without an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies."""
+
+    def __init__(self, window: int = 50):
+        self.samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+class ModelRouter:
+    """Calls an ordered chain of models with hedging, fallback and per-model circuit breakers.
+
+    The first model whose breaker allows it is called. If it has not answered within the
+    hedge delay (its rolling p95, clamped to [min_hedge_delay, max_hedge_delay]; the default
+    delay until `min_samples` latencies are known), the next model is called in parallel and
+    whichever succeeds first wins. A failure moves on to the next model immediately.
+    """
+
+    def __init__(
+        self,
+        models: list[str],
+        hedge_delay: float = 8.0,
+        min_hedge_delay: float = 1.0,
+        max_hedge_delay: float = 15.0,
+        min_samples: int = 10,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_workers: int = 16,
+    ):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+        self.breakers = {m: CircuitBreaker(failure_threshold, reset_timeout) for m in self.models}
+        self.latency = {m: LatencyTracker() for m in self.models}
+        self.counters = {m: {"calls": 0, "wins": 0, "failures": 0, "hedges": 0} for m in self.models}
+        self._counter_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-call")
+
+    def _count(self, model: str, counter: str) -> None:
+        with self._counter_lock:
+            self.counters[model][counter] += 1
+
+    def delay_for(self, model: str) -> float:
+        tracker = self.latency[model]
+        p95 = tracker.percentile(0.95)
+        if p95 is None or len(tracker.samples) < self.min_samples:
+            return self.hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, p95))
+
+    def _candidates(self):
+        """Yields models in chain order, skipping those with an open breaker."""
+        for model in self.models:
+            if self.breakers[model].allow():
+                yield model
+
+    def _record(self, model: str, started: float, error: BaseException | None) -> None:
+        if error is None:
+            self.latency[model].record(time.monotonic() - started)
+            self.breakers[model].record_success()
+        else:
+            self.breakers[model].record_failure()
+            self._count(model, "failures")
+            print(f"Model {model} failed: {error}")
+
+    # --- Sync ---
+
+    def _timed_call(self, call: Callable[..., Any], model: str, kwargs: dict[str, Any]) -> Any:
+        started = time.monotonic()
+        try:
+            result = call(model=model, **kwargs)
+        except BaseException as e:
+            self._record(model, started, e)
+            raise
+        self._record(model, started, None)
+        return result
+
+    def create(self, call: Callable[..., Any], **kwargs: Any) -> tuple[Any, str]:
+        """Runs `call(model=..., **kwargs)` across the chain and returns (result, winning model)."""
+        candidates = self._candidates()
+        running: dict[Future, str] = {}
+        last_error: BaseException | None = None
+
+        def launch(hedge: bool) -> bool:
+            model = next(candidates, None)
+            if model is None:
+                return False
+            self._count(model, "calls")
+            if hedge:
+                self._count(model, "hedges")
+            running[self._executor.submit(self._timed_call, call, model, kwargs)] = model
+            return True
+
+        if not launch(hedge=False):
+            raise RuntimeError("All models are unavailable (circuit open)")
+        while running:
+            newest = list(running.values())[-1]
+            done, _ = wait(running, timeout=self.delay_for(newest), return_when=FIRST_COMPLETED)
+            if not done:
+                # The newest call is slower than usual: hedge with the next model.
+                launch(hedge=True)
+                continue
+            for future in done:
+                model = running.pop(future)
+                if future.exception() is None:
+                    self._count(model, "wins")
+                    return future.result(), model
+                last_error = future.exception()
+            if not running:
+                launch(hedge=False)
+        raise last_error or RuntimeError("All models failed")
+
+    # --- Async ---
+
+    async def _atimed_call(self, call: Callable[..., Awaitable[Any]], model: str, kwargs: dict[str, Any]) -> Any:
+        started = time.monotonic()
+        try:
+            result = await call(model=model, **kwargs)
+        except asyncio.CancelledError:
+            self.breakers[model].release()
+            raise
+        except BaseException as e:
+            self._record(model, started, e)
+            raise
+        self._record(model, started, None)
+        return result
+
+    async def acreate(
+        self,
+        call: Callable[..., Awaitable[Any]],
+        on_discard: Callable[[Any], Awaitable[None]] | None = None,
+        **kwargs: Any,
+    ) -> tuple[Any, str]:
+        """Async variant of `create`; losing hedged calls are cancelled (or passed to `on_discard`)."""
+        candidates = self._candidates()
+        running: dict[asyncio.Task, str] = {}
+        last_error: BaseException | None = None
+
+        def launch(hedge: bool) -> bool:
+            model = next(candidates, None)
+            if model is None:
+                return False
+            self._count(model, "calls")
+            if hedge:
+                self._count(model, "hedges")
+            running[asyncio.ensure_future(self._atimed_call(call, model, kwargs))] = model
+            return True
+
+        async def discard_rest():
+            for task in running:
+                task.cancel()
+            for task in running:
+                try:
+                    result = await task
+                except BaseException:
+                    continue
+                if on_discard:
+                    await on_discard(result)
+
+        if not launch(hedge=False):
+            raise RuntimeError("All models are unavailable (circuit open)")
+        try:
+            while running:
+                newest = list(running.values())[-1]
+                done, _ = await asyncio.wait(running, timeout=self.delay_for(newest), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch(hedge=True)
+                    continue
+                for task in done:
+                    model = running.pop(task)
+                    if task.exception() is None:
+                        self._count(model, "wins")
+                        return task.result(), model
+                    last_error = task.exception()
+                if not running:
+                    launch(hedge=False)
+        finally:
+            await discard_rest()
+        raise last_error or RuntimeError("All models failed")
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._counter_lock:
+            counters = {m: dict(c) for m, c in self.counters.items()}
+        return {
+            m: {
+                **counters[m],
+                "breaker": self.breakers[m].state,
+                "p95_s": self.latency[m].percentile(0.95),
+                "hedge_delay_s": round(self.delay_for(m), 3),
+            }
+            for m in self.models
+        }
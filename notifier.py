@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from typing import Callable
+
+from metrics import EMAIL_SECONDS, span
+
+RESEND_URL = "https://api.resend.com/emails"
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+
+
+class Notifier:
+    """Sends email via Resend, SendGrid or SMTP over long-lived, pooled connections.
+
+    Each HTTP provider gets its own keep-alive `requests.Session`, and the SMTP
+    fallback keeps one authenticated connection open until it has been idle for
+    `smtp_idle_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        resend_url: str = RESEND_URL,
+        sendgrid_url: str = SENDGRID_URL,
+        smtp_host: str = "smtp.gmail.com",
+        smtp_port: int = 465,
+        smtp_ssl: bool = True,
+        smtp_idle_timeout: float = 60.0,
+        timeout: float = 10,
+    ):
+        self.resend_url = resend_url
+        self.sendgrid_url = sendgrid_url
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.smtp_ssl = smtp_ssl
+        self.smtp_idle_timeout = smtp_idle_timeout
+        self.timeout = timeout
+        # requests/smtplib are imported on first use to keep process start-up light.
+        self._sessions: dict = {}
+        self._sessions_lock = threading.Lock()
+        self._smtp = None
+        self._smtp_user: str | None = None
+        self._smtp_last_used = 0.0
+        self._smtp_lock = threading.Lock()
+
+    # --- HTTP providers ---
+
+    def _session(self, provider: str):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self._sessions_lock:
+            session = self._sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[provider] = session
+            return session
+
+    def send_resend(self, api_key: str, recipient_email: str, subject: str, body: str) -> bool:
+        try:
+            response = self._session("resend").post(
+                self.resend_url,
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={
+                    "from": "Portfolio AI <onboarding@resend.dev>",
+                    "to": [recipient_email],
+                    "subject": subject,
+                    "text": body,
+                },
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            print(f"Email sent via Resend! ID: {response.json().get('id')}")
+            return True
+        except Exception as e:
+            print(f"Resend API failed: {e}")
+            return False
+
+    def send_sendgrid(self, api_key: str, from_email: str, recipient_email: str, subject: str, body: str) -> bool:
+        try:
+            response = self._session("sendgrid").post(
+                self.sendgrid_url,
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+                json={
+                    "personalizations": [{"to": [{"email": recipient_email}]}],
+                    "from": {"email": from_email},
+                    "subject": subject,
+                    "content": [{"type": "text/plain", "value": body}],
+                },
+                timeout=self.timeout,
+            )
+            if response.status_code in [200, 201, 202]:
+                print(f"Email sent via SendGrid! Status: {response.status_code}")
+                return True
+            print(f"SendGrid failed: {response.status_code} - {response.text}")
+        except Exception as e:
+            print(f"SendGrid API failed: {e}")
+        return False
+
+    # --- SMTP ---
+
+    def _smtp_connect(self, user: str, password: str):
+        import smtplib
+
+        smtp_cls = smtplib.SMTP_SSL if self.smtp_ssl else smtplib.SMTP
+        server = smtp_cls(self.smtp_host, self.smtp_port, timeout=self.timeout)
+        server.login(user, password)
+        return server
+
+    def _smtp_close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    def send_smtp(self, user: str, password: str, recipient_email: str, subject: str, body: str) -> bool:
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        msg = MIMEMultipart()
+        msg["From"] = user
+        msg["To"] = recipient_email
+        msg["Subject"] = subject
+        msg.attach(MIMEText(body, "plain"))
+
+        with self._smtp_lock:
+            expired = time.monotonic() - self._smtp_last_used > self.smtp_idle_timeout
+            if self._smtp is not None and (expired or self._smtp_user != user):
+                self._smtp_close()
+            # A pooled connection may have been dropped by the server; reconnect once and retry.
+            for attempt in range(2):
+                reused = self._smtp is not None
+                try:
+                    if self._smtp is None:
+                        self._smtp = self._smtp_connect(user, password)
+                        self._smtp_user = user
+                    self._smtp.send_message(msg)
+                    self._smtp_last_used = time.monotonic()
+                    print(f"Email sent via SMTP successfully: {subject}")
+                    return True
+                except Exception as e:
+                    self._smtp_close()
+                    if not reused or attempt:
+                        print(f"Failed to send email via SMTP: {e}")
+                        return False
+        return False
+
+    # --- Failover ---
+
+    @staticmethod
+    def _attempt(provider: str, send: Callable[..., bool], *args: str) -> bool:
+        """Runs one provider attempt inside an `email` span."""
+        with span(EMAIL_SECONDS, "email", provider=provider) as labels:
+            ok = send(*args)
+            labels["outcome"] = "ok" if ok else "error"
+        return ok
+
+    def send(self, subject: str, body: str) -> bool:
+        """Send email via Resend/SendGrid API (preferred for Render) or SMTP (local fallback)."""
+        recipient_email = os.getenv("RECIPIENT_EMAIL", "").strip()
+        smtp_email = os.getenv("SMTP_EMAIL", "").strip()
+        smtp_password = os.getenv("SMTP_PASSWORD", "").strip()
+        from_email = os.getenv("SENDGRID_VERIFIED_SENDER", "").strip() or smtp_email or "no-reply@portfolio.com"
+
+        # METHOD 1: Resend API
+        resend_key = os.getenv("RESEND_API_KEY", "").strip()
+        if resend_key and self._attempt("resend", self.send_resend, resend_key, recipient_email, subject, body):
+            return True
+
+        # METHOD 2: SendGrid API
+        sendgrid_key = os.getenv("SENDGRID_API_KEY", "").strip()
+        if sendgrid_key and self._attempt(
+            "sendgrid", self.send_sendgrid, sendgrid_key, from_email, recipient_email, subject, body
+        ):
+            return True
+
+        # METHOD 3: Gmail SMTP (Local fallback)
+        if not all([smtp_email, smtp_password, recipient_email]):
+            print("Email not configured (No Resend/SendGrid Key, No SMTP details).")
+            return False
+        return self._attempt("smtp", self.send_smtp, smtp_email, smtp_password, recipient_email, subject, body)
+
+    def close(self) -> None:
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+        with self._smtp_lock:
+            self._smtp_close()
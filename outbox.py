@@ -0,0 +1,287 @@
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Callable
+
+# Retry schedule for failed deliveries: 2s, 4s, 8s ... capped at 5 minutes.
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+MAX_ATTEMPTS = 8
+# A claimed notification is left to its worker this long before another worker may retry it
+# (covers a worker that died mid-send); long enough for every provider to time out.
+CLAIM_LEASE = 300.0
+
+
+def format_digest(rows: list[tuple[str, str, str, int, float]]) -> tuple[str, str]:
+    """Builds the digest email from (kind, subject, body, count, created_at) rows."""
+    kinds: dict[str, int] = {}
+    for kind, *_ in rows:
+        kinds[kind] = kinds.get(kind, 0) + 1
+    summary = ", ".join(f"{n} {kind}{'s' if n != 1 else ''}" for kind, n in kinds.items())
+    sections = []
+    for _, subject, body, count, _ in rows:
+        repeats = f" (x{count})" if count > 1 else ""
+        sections.append(f"{subject}{repeats}\n{body.strip()}")
+    return f"📬 Portfolio AI digest: {summary}", "\n\n---\n\n".join(sections) + "\n"
+
+
+class Outbox:
+    """Durable SQLite queue of pending email notifications."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    sent_at REAL,
+                    last_error TEXT
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+            # Notifications gathered for the next digest; repeats of the same key only bump `count`.
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS digest (
+                    kind TEXT NOT NULL,
+                    dedup_key TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 1,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (kind, dedup_key)
+                )"""
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def enqueue(self, subject: str, body: str) -> int:
+        """Stores a notification for later delivery and returns its id."""
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            cur = conn.execute(
+                "INSERT INTO outbox (subject, body, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (subject, body, now, now),
+            )
+            return cur.lastrowid
+
+    def add_to_digest(self, kind: str, dedup_key: str, subject: str, body: str) -> int:
+        """Gathers a notification for the next digest and returns how many distinct entries are waiting.
+
+        A repeat of the same (kind, dedup_key) replaces the stored text with the latest version
+        and counts the repetition instead of adding an entry.
+        """
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                """INSERT INTO digest (kind, dedup_key, subject, body, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(kind, dedup_key) DO UPDATE SET
+                    subject = excluded.subject, body = excluded.body,
+                    count = count + 1, updated_at = excluded.updated_at""",
+                (kind, dedup_key, subject, body, now, now),
+            )
+            return conn.execute("SELECT COUNT(*) FROM digest").fetchone()[0]
+
+    def digest_status(self) -> tuple[int, float | None]:
+        """(distinct entries waiting, creation time of the oldest one)."""
+        with self._lock, closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*), MIN(created_at) FROM digest").fetchone()
+
+    def flush_digest(self) -> int | None:
+        """Turns all gathered entries into one outbox email (atomically) and returns its id."""
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT kind, subject, body, count, created_at FROM digest ORDER BY created_at"
+                ).fetchall()
+                if not rows:
+                    conn.execute("ROLLBACK")
+                    return None
+                subject, body = format_digest(rows)
+                now = time.time()
+                cur = conn.execute(
+                    "INSERT INTO outbox (subject, body, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                    (subject, body, min(r[4] for r in rows), now),
+                )
+                conn.execute("DELETE FROM digest")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return cur.lastrowid
+
+    def due(self, limit: int = 10, lease: float = CLAIM_LEASE) -> list[tuple[int, str, str, int]]:
+        """Claims pending notifications whose next attempt is due, plus ones whose claim expired.
+
+        Claimed rows are marked 'sending' in one write transaction, so when several workers
+        share the file each notification goes to exactly one of them.
+        """
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, subject, body, attempts FROM outbox "
+                    "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                # While 'sending', next_attempt_at is the lease deadline.
+                conn.executemany(
+                    "UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                    [(now + lease, row[0]) for row in rows],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return rows
+
+    def next_due_in(self) -> float | None:
+        """Seconds until the next pending notification (or expired claim) is due, or None if the queue is empty."""
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_sent(self, item_id: int) -> None:
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ? WHERE id = ?",
+                (time.time(), item_id),
+            )
+
+    def mark_failed(self, item_id: int, attempts: int, error: str) -> None:
+        """Schedules a retry with exponential backoff, or gives up after MAX_ATTEMPTS."""
+        attempts += 1
+        status = "dead" if attempts >= MAX_ATTEMPTS else "pending"
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempts - 1)))
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, time.time() + delay, error, item_id),
+            )
+
+    def status(self) -> dict[str, float | int | None]:
+        """Queue depth, age of the oldest pending item and delivery latency of sent items."""
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            pending, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM outbox WHERE status IN ('pending', 'sending')"
+            ).fetchone()
+            sent, avg_latency, max_latency = conn.execute(
+                "SELECT COUNT(*), AVG(sent_at - created_at), MAX(sent_at - created_at) FROM outbox WHERE status = 'sent'"
+            ).fetchone()
+            dead = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'dead'").fetchone()[0]
+            digest = conn.execute("SELECT COUNT(*) FROM digest").fetchone()[0]
+        return {
+            "pending": pending,
+            "digest_pending": digest,
+            "sent": sent,
+            "dead": dead,
+            "oldest_pending_age_s": round(now - oldest, 3) if oldest else None,
+            "avg_delivery_latency_s": round(avg_latency, 3) if avg_latency is not None else None,
+            "max_delivery_latency_s": round(max_latency, 3) if max_latency is not None else None,
+        }
+
+
+class OutboxWorker:
+    """Background thread that drains the outbox through a sender callable."""
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        sender: Callable[[str, str], bool],
+        idle_poll: float = 30.0,
+        digest_window: float = 0.0,
+        digest_max_items: int = 20,
+    ):
+        self.outbox = outbox
+        self.sender = sender
+        self.idle_poll = idle_poll
+        # Digest entries are flushed `digest_window` seconds after the oldest one arrived,
+        # or as soon as `digest_max_items` distinct entries are waiting.
+        self.digest_window = digest_window
+        self.digest_max_items = digest_max_items
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def flush_digest_if_due(self) -> float | None:
+        """Flushes the digest when its window or size limit is reached; returns seconds until it will be."""
+        count, oldest = self.outbox.digest_status()
+        if not count:
+            return None
+        remaining = oldest + self.digest_window - time.time()
+        if remaining <= 0 or count >= self.digest_max_items:
+            self.outbox.flush_digest()
+            return None
+        return remaining
+
+    def drain_once(self) -> int:
+        """Attempts every due notification once and returns how many were delivered."""
+        delivered = 0
+        for item_id, subject, body, attempts in self.outbox.due():
+            try:
+                ok = self.sender(subject, body)
+                error = "" if ok else "All email providers failed"
+            except Exception as e:
+                ok, error = False, str(e)
+            if ok:
+                self.outbox.mark_sent(item_id)
+                delivered += 1
+            else:
+                print(f"Outbox delivery failed (id={item_id}, attempt {attempts + 1}): {error}")
+                self.outbox.mark_failed(item_id, attempts, error)
+        return delivered
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                digest_wait = self.flush_digest_if_due()
+                self.drain_once()
+                waits = [w for w in (self.outbox.next_due_in(), digest_wait) if w is not None]
+                wait = min(waits) if waits else None
+            except Exception as e:
+                print(f"Outbox worker error: {e}")
+                wait = self.idle_poll
+            self._wake.wait(self.idle_poll if wait is None else min(wait, self.idle_poll))
@@ -0,0 +1,111 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+from singleflight import SingleFlight
+
+# Persona ids double as directory names and URL path segments.
+PERSONA_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+# A persona's system prompt, with a $bio placeholder. Required: without it a persona would speak as the default agent.
+PROMPT_TEMPLATE_NAME = "prompt.tmpl"
+
+
+class UnknownPersona(LookupError):
+    pass
+
+
+class PersonaRegistry:
+    """Persona agents built lazily from `<root>/<persona id>/` and kept LRU.
+
+    Each persona directory holds its context files and a required prompt template. The
+    agent is built by `factory(persona_id, directory)` on the first request for it;
+    concurrent first requests share one build. At most `max_loaded` agents stay in memory
+    and ones unused for `idle_ttl` seconds are dropped. An evicted persona is simply
+    rebuilt on its next request (its retrieval index and cache are persisted on disk).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        factory: Callable[[str, Path], Any],
+        max_loaded: int = 4,
+        idle_ttl: float = 3600.0,
+    ):
+        self.root = Path(root)
+        self.factory = factory
+        self.max_loaded = max_loaded
+        self.idle_ttl = idle_ttl
+        self._agents: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._builds = SingleFlight()
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def directory(self, persona_id: str) -> Path:
+        if not PERSONA_ID.match(persona_id) or not (self.root / persona_id / PROMPT_TEMPLATE_NAME).is_file():
+            raise UnknownPersona(persona_id)
+        return self.root / persona_id
+
+    def available(self) -> list[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            p.name for p in self.root.iterdir() if PERSONA_ID.match(p.name) and (p / PROMPT_TEMPLATE_NAME).is_file()
+        )
+
+    def get(self, persona_id: str) -> Any:
+        """The persona's agent, building it on first use. Raises UnknownPersona."""
+        with self._lock:
+            entry = self._agents.get(persona_id)
+            if entry is not None:
+                now = time.monotonic()
+                self._agents[persona_id] = (entry[0], now)
+                self._agents.move_to_end(persona_id)
+                self._evict(now)
+                return entry[0]
+        directory = self.directory(persona_id)
+        agent, _ = self._builds.do(persona_id, lambda: self._load(persona_id, directory))
+        return agent
+
+    def _load(self, persona_id: str, directory: Path) -> Any:
+        start = time.perf_counter()
+        agent = self.factory(persona_id, directory)
+        elapsed = time.perf_counter() - start
+        print(f"Persona '{persona_id}' loaded in {elapsed:.2f}s.")
+        with self._lock:
+            self.loads += 1
+            self.load_seconds += elapsed
+            now = time.monotonic()
+            self._agents[persona_id] = (agent, now)
+            self._evict(now)
+        return agent
+
+    def _evict(self, now: float) -> None:
+        """Drops idle agents, then the least recently used beyond `max_loaded` (lock held)."""
+        # Entries are kept in last-use order, so idle agents are always at the front.
+        while self._agents:
+            persona_id, (_, last_used) = next(iter(self._agents.items()))
+            if last_used + self.idle_ttl > now and len(self._agents) <= self.max_loaded:
+                break
+            del self._agents[persona_id]
+            self.evictions += 1
+
+    def unload(self, persona_id: str) -> None:
+        with self._lock:
+            self._agents.pop(persona_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._evict(time.monotonic())
+            return {
+                "available": self.available(),
+                "loaded": list(self._agents),
+                "max_loaded": self.max_loaded,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_seconds_total": round(self.load_seconds, 3),
+            }
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from math import floor
+from pathlib import Path
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport):
+    """Rate-limit counters in a local SQLite (WAL) file shared by every worker process.
+
+    Register a limiter with ``storage_uri="sqlite:///relative/path.db"`` or
+    ``"sqlite:////absolute/path.db"``. Increments are single write transactions, so
+    concurrent workers never lose a hit. Expired counters are deleted at most every
+    `compact_interval` seconds. Supports the fixed-window strategy (slowapi's default) and the
+    sliding-window-counter strategy, which the token budgets use.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, compact_interval: float = 60.0, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        path = urllib.parse.urlparse(uri).path
+        # SQLAlchemy convention: three slashes for a relative path, four for an absolute one.
+        self.path = Path(path[1:] if path.startswith("/") else path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.compact_interval = float(compact_interval)
+        self._local = threading.local()
+        self._last_compaction = 0.0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread and process: connections must not cross a fork.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _maybe_compact(self, conn: sqlite3.Connection, now: float) -> None:
+        if now - self._last_compaction < self.compact_interval:
+            return
+        self._last_compaction = now
+        conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+
+    def _incr(self, conn: sqlite3.Connection, key: str, expiry: float, amount: int, now: float) -> int:
+        conn.execute(
+            """INSERT INTO counters (key, count, expires_at) VALUES (?1, ?2, ?3)
+            ON CONFLICT(key) DO UPDATE SET
+                count = CASE WHEN expires_at <= ?4 THEN ?2 ELSE count + ?2 END,
+                expires_at = CASE WHEN expires_at <= ?4 THEN ?3 ELSE expires_at END""",
+            (key, amount, now + expiry, now),
+        )
+        return conn.execute("SELECT count FROM counters WHERE key = ?", (key,)).fetchone()[0]
+
+    def _count(self, conn: sqlite3.Connection, key: str, now: float) -> int:
+        row = conn.execute("SELECT count FROM counters WHERE key = ? AND expires_at > ?", (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            count = self._incr(conn, key, expiry, amount, now)
+            self._maybe_compact(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def get(self, key: str) -> int:
+        return self._count(self._conn(), key, time.time())
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    # --- Sliding window counter ---
+    # Same layout as limits' memory storage: one counter per window, keyed "<key>/<window number>".
+
+    @staticmethod
+    def _window_keys(key: str, expiry: int, now: float) -> tuple[str, str]:
+        return f"{key}/{int((now - expiry) / expiry)}", f"{key}/{int(now / expiry)}"
+
+    def _window(self, conn: sqlite3.Connection, key: str, expiry: int, now: float) -> tuple[int, float, int, float]:
+        previous_key, current_key = self._window_keys(key, expiry, now)
+        previous_count = self._count(conn, previous_key, now)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, self._count(conn, current_key, now), current_ttl
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        return self._window(self._conn(), key, expiry, time.time())
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        conn = self._conn()
+        # Check and increment in one write transaction, so concurrent workers cannot overshoot.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            previous_count, previous_ttl, current_count, _ = self._window(conn, key, expiry, now)
+            acquired = floor(previous_count * previous_ttl / expiry + current_count) + amount <= limit
+            if acquired:
+                self._incr(conn, self._window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            self._maybe_compact(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self._window_keys(key, expiry, time.time()):
+            self.clear(window_key)
+
+    def check(self) -> bool:
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        return self._conn().execute("DELETE FROM counters").rowcount
+
+    def clear(self, key: str) -> None:
+        self._conn().execute("DELETE FROM counters WHERE key = ?", (key,))
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation so trivial variants share a key."""
+    return _WHITESPACE.sub(" ", text.strip().lower()).rstrip(" ?!.")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def history_hash(history: list[dict[str, Any]]) -> str:
+    return text_hash(json.dumps([[m.get("role"), m.get("content")] for m in history], ensure_ascii=False))
+
+
+class ResponseCache:
+    """LRU + TTL cache of chat replies, capped in bytes, optionally persisted to SQLite."""
+
+    def __init__(
+        self,
+        max_bytes: int = 1_000_000,
+        ttl: float = 3600.0,
+        history_window: int = 6,
+        path: Path | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.history_window = history_window
+        self.path = Path(path) if path else None
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.path:
+            self._load()
+
+    def key(self, msg: str, history: list[dict[str, Any]], system_prompt: str) -> str:
+        recent = history[-self.history_window:] if self.history_window else []
+        return text_hash("\n".join([normalize_message(msg), history_hash(recent), text_hash(system_prompt)]))
+
+    @staticmethod
+    def _size(key: str, reply: str) -> int:
+        return len(key) + len(reply.encode("utf-8"))
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, reply: str) -> None:
+        size = self._size(key, reply)
+        if size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (reply, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            if self.path:
+                self._write(key, reply, expires_at)
+
+    def _remove(self, key: str) -> None:
+        reply, _ = self._entries.pop(key)
+        self._bytes -= self._size(key, reply)
+        if self.path:
+            with closing(self._connect()) as conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self.path:
+                with closing(self._connect()) as conn:
+                    conn.execute("DELETE FROM responses")
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    # --- Persistence ---
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def _write(self, key: str, reply: str, expires_at: float) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, reply, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                (key, reply, expires_at, time.time()),
+            )
+
+    def _load(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, reply TEXT NOT NULL, expires_at REAL NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            rows = conn.execute("SELECT key, reply, expires_at FROM responses ORDER BY stored_at").fetchall()
+        for key, reply, expires_at in rows:
+            self._entries[key] = (reply, expires_at)
+            self._bytes += self._size(key, reply)
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
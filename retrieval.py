@@ -0,0 +1,149 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+_TERMS = re.compile(r"\w+", re.UNICODE)
+_HEADING = re.compile(r"^#{1,6}\s")
+STEM_CHARS = 6
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from have how i in is it me my of on or so that the "
+    "this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    # Truncation stemming: "availability"/"available" and Finnish inflections share a 6-char prefix.
+    return [t[:STEM_CHARS] for t in _TERMS.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, source: str, max_chars: int = 700) -> list[str]:
+    """Splits a markdown-ish context file on headings, then packs paragraphs into chunks of ~max_chars.
+
+    Each chunk is prefixed with its source file and section heading so it still reads
+    sensibly once lifted out of the file.
+    """
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block or set(block) <= {"-", "*", "_"}:
+            continue
+        first_line = block.splitlines()[0]
+        if _HEADING.match(first_line):
+            sections.append((first_line.lstrip("#").strip().strip("*"), []))
+            block = "\n".join(block.splitlines()[1:]).strip()
+            if not block:
+                continue
+        sections[-1][1].append(block)
+
+    chunks = []
+    for heading, paragraphs in sections:
+        label = f"[{source}{' / ' + heading if heading else ''}]"
+        current = ""
+        for paragraph in paragraphs:
+            if current and len(current) + len(paragraph) > max_chars:
+                chunks.append(f"{label}\n{current}")
+                current = ""
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current:
+            chunks.append(f"{label}\n{current}")
+    return chunks
+
+
+class RetrievalIndex:
+    """Offline BM25 index over the text files in a context directory, persisted as JSON.
+
+    `refresh()` compares file mtimes and sizes against the stored index and only
+    re-chunks files that changed.
+    """
+
+    def __init__(self, source_dir: Path, path: Path | None = None, k1: float = 1.5, b: float = 0.75):
+        self.source_dir = Path(source_dir)
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        # file name -> {"mtime_ns", "size", "chunks": [text], "terms": [{term: tf}]}
+        self.files: dict[str, dict] = {}
+        self._chunks: list[str] | None = None
+        self._load()
+        self.refresh()
+
+    def _load(self) -> None:
+        if self.path and self.path.exists():
+            try:
+                self.files = json.loads(self.path.read_text(encoding="utf-8"))["files"]
+            except Exception as e:
+                print(f"Ignoring unreadable retrieval index: {e}")
+                self.files = {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"files": self.files}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def refresh(self) -> list[str]:
+        """Re-indexes new or modified files, drops deleted ones and returns the names that changed."""
+        with self._lock:
+            current = {p.name: p for p in sorted(self.source_dir.glob("*.txt"))}
+            changed = [name for name in self.files if name not in current]
+            for name in changed:
+                del self.files[name]
+            for name, p in current.items():
+                stat = p.stat()
+                entry = self.files.get(name)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    continue
+                chunks = chunk_text(p.read_text(encoding="utf-8"), name)
+                self.files[name] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "chunks": chunks,
+                    "terms": [dict(Counter(tokenize(c))) for c in chunks],
+                }
+                changed.append(name)
+            if changed or self._chunks is None:
+                self._rebuild_stats()
+            if changed or (self.path and not self.path.exists()):
+                self._save()
+            return changed
+
+    def _rebuild_stats(self) -> None:
+        self._chunks = []
+        self._terms: list[dict[str, int]] = []
+        for name in sorted(self.files):
+            self._chunks.extend(self.files[name]["chunks"])
+            self._terms.extend(self.files[name]["terms"])
+        self._lengths = [sum(tf.values()) for tf in self._terms]
+        self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        df = Counter(term for tf in self._terms for term in tf)
+        n = len(self._terms)
+        self._idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def search(self, query: str, k: int = 4) -> list[str]:
+        """Returns the top-k chunks for the query, in their original file order."""
+        terms = [t for t in tokenize(query) if t in self._idf]
+        if not terms:
+            return []
+        scores = []
+        for i, tf in enumerate(self._terms):
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / self._avg_length)
+            score = sum(self._idf[t] * tf[t] * (self.k1 + 1) / (tf[t] + norm) for t in terms if t in tf)
+            if score > 0:
+                scores.append((score, i))
+        top = sorted(scores, reverse=True)[:k]
+        return [self._chunks[i] for i in sorted(i for _, i in top)]
+
+    def overview(self) -> list[str]:
+        """The opening chunk of every file, used when a query matches nothing (e.g. "hi")."""
+        return [self.files[name]["chunks"][0] for name in sorted(self.files) if self.files[name]["chunks"]]
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
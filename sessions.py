@@ -0,0 +1,187 @@
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+
+def pack(history: list[dict[str, Any]]) -> bytes:
+    """Compact session encoding: zlib-compressed JSON of [role, content] pairs."""
+    return zlib.compress(json.dumps([[m["role"], m["content"]] for m in history], ensure_ascii=False).encode(), 1)
+
+
+def unpack(data: bytes) -> list[dict[str, Any]]:
+    return [{"role": role, "content": content} for role, content in json.loads(zlib.decompress(data))]
+
+
+class SessionStore:
+    """Server-side conversation histories with LRU + idle-TTL eviction, optionally persisted to SQLite.
+
+    Each session keeps at most `max_messages` messages, stored packed. Sessions unused for
+    `idle_ttl` seconds expire, and the least recently used ones are evicted once the packed
+    total exceeds `max_bytes`. A persisted store is shared by every worker on the file: the
+    row, not this process's copy, is the session, so each use reads it, and size eviction
+    only drops the in-memory copy (rows are deleted once they idle out or on `delete`).
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 5_000_000,
+        idle_ttl: float = 3600.0,
+        max_messages: int = 50,
+        path: Path | None = None,
+    ):
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.path = Path(path) if path else None
+        self._sessions: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loaded = self.path is None
+        self.created = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(16)
+
+    def _size(self, session_id: str, data: bytes) -> int:
+        return len(session_id) + len(data)
+
+    def _live(self, session_id: str) -> bytes | None:
+        """Returns the packed history if the session exists and has not idled out (lock held)."""
+        self._ensure_loaded()
+        entry = self._fetch(session_id) if self.path else self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if entry[1] + self.idle_ttl <= time.time():
+            self._remove(session_id)
+            self.expirations += 1
+            return None
+        return entry[0]
+
+    def get(self, session_id: str) -> list[dict[str, Any]] | None:
+        """The session's history, or None if it is unknown or expired. Counts as use."""
+        with self._lock:
+            data = self._live(session_id)
+            if data is None:
+                return None
+            # Reads only refresh the in-memory LRU position; the next append persists the new time.
+            self._sessions[session_id] = (data, time.time())
+            self._sessions.move_to_end(session_id)
+            return unpack(data)
+
+    def append(self, session_id: str, messages: list[dict[str, Any]]) -> None:
+        """Adds messages to a session (creating it if needed), keeping the newest `max_messages`."""
+        with self._lock:
+            data = self._live(session_id)
+            if data is None:
+                self.created += 1
+            history = (unpack(data) if data else []) + messages
+            self._store(session_id, pack(history[-self.max_messages:]))
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            self._remove(session_id)
+
+    def _store(self, session_id: str, data: bytes) -> None:
+        now = time.time()
+        if session_id in self._sessions:
+            old, _ = self._sessions.pop(session_id)
+            self._bytes -= self._size(session_id, old)
+        self._sessions[session_id] = (data, now)
+        self._bytes += self._size(session_id, data)
+        # Entries are kept in last-use order, so idle sessions are always at the front.
+        while len(self._sessions) > 1:
+            oldest_id, (_, last_used) = next(iter(self._sessions.items()))
+            if last_used + self.idle_ttl > now:
+                break
+            # Persisted rows are expired below by their own last use, which may be another worker's.
+            self._evict(oldest_id)
+            if not self.path:
+                self.expirations += 1
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            self._evict(next(iter(self._sessions)))
+            self.evictions += 1
+        if self.path:
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sessions (id, data, last_used) VALUES (?, ?, ?)", (session_id, data, now)
+                )
+                self.expirations += conn.execute(
+                    "DELETE FROM sessions WHERE last_used <= ?", (now - self.idle_ttl,)
+                ).rowcount
+
+    def _forget(self, session_id: str) -> None:
+        """Drops the in-memory copy only."""
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._bytes -= self._size(session_id, entry[0])
+
+    def _evict(self, session_id: str) -> None:
+        # A persisted session stays usable (here or in another worker); only memory is freed.
+        if self.path:
+            self._forget(session_id)
+        else:
+            self._remove(session_id)
+
+    def _remove(self, session_id: str) -> None:
+        self._forget(session_id)
+        if self.path:
+            with closing(self._connect()) as conn:
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "created": self.created,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    # --- Persistence ---
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def _fetch(self, session_id: str) -> tuple[bytes, float] | None:
+        """Reads the session's row, which another worker may have changed, into memory (lock held)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT data, last_used FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        self._forget(session_id)
+        if row is None:
+            return None
+        self._sessions[session_id] = (row[0], row[1])
+        self._bytes += self._size(session_id, row[0])
+        return row[0], row[1]
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+            conn.execute("DELETE FROM sessions WHERE last_used <= ?", (time.time() - self.idle_ttl,))
+            rows = conn.execute("SELECT id, data, last_used FROM sessions ORDER BY last_used").fetchall()
+        for session_id, data, last_used in rows:
+            self._sessions[session_id] = (data, last_used)
+            self._bytes += self._size(session_id, data)
+        while self._bytes > self.max_bytes and len(self._sessions) > 1:
+            self._evict(next(iter(self._sessions)))
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Callable, Hashable
+
+
+class _Broadcast:
+    """Token log of one in-flight stream that any number of readers can replay and follow."""
+
+    def __init__(self):
+        self.tokens: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def produce(self, source: AsyncIterator[str]) -> None:
+        try:
+            async for token in source:
+                self.tokens.append(token)
+                self._notify()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+
+    async def follow(self) -> AsyncIterator[str]:
+        i = 0
+        while True:
+            changed = self._changed
+            while i < len(self.tokens):
+                yield self.tokens[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving while it is in
+    flight wait for and share its result instead of starting their own. Nothing is kept once
+    the call finishes; caching finished results is the response cache's job.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, Future] = {}
+        self._streams: dict[Hashable, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Returns (result, shared); `shared` is True when another caller's run produced it."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stream(self, key: Hashable, factory: Callable[[], AsyncIterator[str]]) -> tuple[AsyncIterator[str], bool]:
+        """Async variant: returns (token iterator, shared); every caller receives the full stream of one run.
+
+        Must be called on the event loop. The run is driven by its own task, so it finishes
+        even if the leader's client goes away.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            shared = broadcast is not None
+            if shared:
+                self.coalesced += 1
+            else:
+                broadcast = self._streams[key] = _Broadcast()
+                self.leaders += 1
+                task = asyncio.ensure_future(broadcast.produce(factory()))
+                task.add_done_callback(lambda _: self._forget_stream(key, broadcast))
+        return broadcast.follow(), shared
+
+    def _forget_stream(self, key: Hashable, broadcast: _Broadcast) -> None:
+        with self._lock:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._streams),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,95 @@
+"""
+Tests for chat admission control, its 503 fast-fail and the rate-limit check before it in the API.
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter
+
+import api
+from admission import AdmissionController, Overloaded
+
+
+def test_rejects_when_slots_and_queue_are_full():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=1, max_wait=1.0)
+        await admission.acquire()
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats()["queued"] == 1
+
+        with pytest.raises(Overloaded) as excinfo:
+            await admission.acquire()
+        assert excinfo.value.retry_after == 1
+
+        admission.release()
+        await waiter
+        assert (admission.stats()["active"], admission.stats()["queued"]) == (1, 0)
+        admission.release()
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_waiters_time_out_and_do_not_leak_slots():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=4, max_wait=0.05)
+        await admission.acquire()
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+        admission.release()
+        stats = admission.stats()
+        assert (stats["active"], stats["queued"], stats["timeouts"]) == (0, 0, 1)
+        async with admission.slot():
+            assert admission.stats()["active"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_slots_are_handed_over_in_arrival_order():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=4, max_wait=1.0)
+        order = []
+
+        async def worker(name):
+            async with admission.slot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker(n) for n in "abcd"))
+        assert order == list("abcd")
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_overloaded_chat_gets_503_while_health_still_answers(monkeypatch):
+    monkeypatch.setattr(api, "ADMISSION", AdmissionController(max_concurrent=0, max_queue=0, max_wait=3))
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    client = TestClient(api.app)
+
+    response = client.post("/chat", json={"message": "hi"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert client.post("/chat/stream", json={"message": "hi"}).status_code == 503
+    assert client.get("/health").status_code == 200
+    assert client.get("/health/admission").json()["rejected"] == 2
+
+
+def test_over_limit_requests_do_not_take_queue_places(monkeypatch):
+    monkeypatch.setattr(api, "ADMISSION", AdmissionController(max_concurrent=0, max_queue=0, max_wait=3))
+    monkeypatch.setattr(api.limiter, "enabled", True)
+    monkeypatch.setattr(api.limiter, "_limiter", FixedWindowRateLimiter(MemoryStorage()))
+    monkeypatch.setattr(api, "CHAT_RATE_LIMIT_ITEMS", api.parse_many("2/minute"))
+    for item in api.CHAT_RATE_LIMIT_ITEMS:
+        api.limiter.limiter.hit(item, "testclient", "chat", cost=2)
+    client = TestClient(api.app)
+
+    assert [client.post(path, json={"message": "hi"}).status_code for path in ("/chat", "/chat/stream")] == [429, 429]
+    stats = client.get("/health/admission").json()
+    assert (stats["admitted"], stats["rejected"], stats["queued"]) == (0, 0, 0)
+    # Checking the limit does not spend it.
+    assert api.limiter.limiter.get_window_stats(api.CHAT_RATE_LIMIT_ITEMS[0], "testclient", "chat").remaining == 0
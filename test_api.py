@@ -0,0 +1,111 @@
+"""
+Tests for the FastAPI app: deferred agent start-up, health endpoints, SSE streaming and rate limits.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter
+
+import api
+from token_budget import TokenBudget
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(api.app) as client:
+        yield client
+
+
+def test_health_answers_without_waiting_for_agent(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_agent_becomes_ready_in_background(client):
+    assert api._agent_ready.wait(20)
+    assert client.get("/health").json()["agent_ready"] is True
+    assert "pending" in client.get("/health/outbox").json()
+
+
+def test_metrics_endpoint_serves_prometheus_text(client):
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_seconds_count{method="GET",route="/health",status="200"}' in response.text
+    assert "# TYPE llm_completion_seconds histogram" in response.text
+
+
+class _StreamingAgent:
+    def __init__(self, tokens, error=None):
+        self.tokens, self.error = tokens, error
+
+    def chat(self, msg, history):
+        self.history = history
+        return "".join(self.tokens)
+
+    async def achat(self, msg, history):
+        for token in self.tokens:
+            yield token
+        if self.error:
+            raise self.error
+
+
+def _events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.fixture
+def stream_client(monkeypatch):
+    monkeypatch.setattr(api, "agent_logic", SimpleNamespace(TOKEN_BUDGET=TokenBudget("memory://")))
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    api._agent_ready.set()
+    return TestClient(api.app)
+
+
+def test_chat_stream_sends_tokens_then_done(stream_client, monkeypatch):
+    monkeypatch.setattr(api, "my_agent", _StreamingAgent(["Hel", "lo", "!"]))
+    response = stream_client.post("/chat/stream", json={"message": "hi"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _events(response) == [
+        ("token", {"token": "Hel"}),
+        ("token", {"token": "lo"}),
+        ("token", {"token": "!"}),
+        ("done", {"reply": "Hello!"}),
+    ]
+
+
+def test_chat_stream_reports_failures_as_error_event(stream_client, monkeypatch):
+    monkeypatch.setattr(api, "my_agent", _StreamingAgent(["Hel"], error=RuntimeError("upstream down")))
+    events = _events(stream_client.post("/chat/stream", json={"message": "hi"}))
+    assert events == [("token", {"token": "Hel"}), ("error", {"detail": "upstream down"})]
+
+
+def test_chat_and_stream_share_one_rate_limit(stream_client, monkeypatch):
+    monkeypatch.setattr(api, "my_agent", _StreamingAgent(["ok"]))
+    monkeypatch.setattr(api.limiter, "enabled", True)
+    monkeypatch.setattr(api.limiter, "_limiter", FixedWindowRateLimiter(MemoryStorage()))
+
+    statuses = [stream_client.post("/chat", json={"message": "hi"}).status_code for _ in range(3)]
+    statuses += [stream_client.post("/chat/stream", json={"message": "hi"}).status_code for _ in range(3)]
+    assert statuses == [200] * 5 + [429]
+
+
+def test_long_history_keeps_only_the_newest_messages(stream_client, monkeypatch):
+    agent = _StreamingAgent(["ok"])
+    monkeypatch.setattr(api, "my_agent", agent)
+    history = [{"role": "user", "content": f"message {i}"} for i in range(api.MAX_HISTORY_MESSAGES + 30)]
+
+    response = stream_client.post("/chat", json={"message": "hi", "history": history})
+    assert response.status_code == 200
+    assert agent.history == history[-api.MAX_HISTORY_MESSAGES:]
@@ -0,0 +1,57 @@
+"""
+Tests for token-budgeted history compaction.
+"""
+
+import sys
+
+import history as history_module
+from history import SUMMARY_PREFIX, HistoryManager, count_tokens, message_tokens
+
+
+def _conversation(turns: int) -> list[dict[str, str]]:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"Question number {i} about your agentic AI projects and experience?"})
+        history.append({"role": "assistant", "content": f"Answer {i}. I build multi-agent systems with LangGraph and CrewAI."})
+    return history
+
+
+def test_short_history_is_untouched():
+    history = _conversation(2)
+    assert HistoryManager(budget_tokens=1000).compact(history) is history
+
+
+def test_long_history_fits_budget_and_keeps_newest_turns():
+    history = _conversation(50)
+    manager = HistoryManager(budget_tokens=400, summary_tokens=120)
+    compacted = manager.compact(history)
+
+    assert sum(map(message_tokens, compacted)) <= 400
+    assert compacted[0]["role"] == "system" and compacted[0]["content"].startswith(SUMMARY_PREFIX)
+    assert compacted[1]["role"] == "user"
+    assert compacted[-2:] == history[-2:]
+
+
+def test_rolling_summary_only_summarizes_newly_folded_turns():
+    folded_counts = []
+
+    def summarizer(previous, messages):
+        folded_counts.append(len(messages))
+        return (previous + "\n" if previous else "") + f"{len(messages)} messages"
+
+    manager = HistoryManager(budget_tokens=400, summary_tokens=120, summarizer=summarizer)
+    history = _conversation(50)
+    manager.compact(history[:-2])
+    manager.compact(history)
+
+    assert folded_counts[1] < folded_counts[0]
+    assert manager.cache_stats()["cached_summaries"] == 2
+
+
+def test_counts_are_estimated_without_loading_tiktoken(monkeypatch):
+    # Counting never imports tiktoken (which may download data); only load_encoding() does.
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    monkeypatch.setattr(history_module, "_encoding", None)
+    assert count_tokens("I build multi-agent systems.") == 11
+    assert history_module.load_encoding() is False
+    assert history_module._encoding is None
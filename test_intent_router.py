@@ -0,0 +1,120 @@
+"""
+Tests for the local intent router and its use in Me.chat.
+"""
+
+from types import SimpleNamespace
+
+import agent_logic
+from intent_router import CANNED_REPLIES, IntentRouter, detect_language
+
+
+def test_routes_canned_questions_in_both_languages():
+    router = IntentRouter()
+
+    route = router.route("Are you available for hire?")
+    assert (route.intent, route.language) == ("availability", "en")
+    assert route.reply == CANNED_REPLIES["availability"]["en"]
+
+    route = router.route("Oletko saatavilla töihin?")
+    assert (route.intent, route.language) == ("availability", "fi")
+    assert route.reply == CANNED_REPLIES["availability"]["fi"]
+
+    assert router.route("Can you help me debug my React code?").intent == "debugging"
+    assert router.route("What's the best way to learn Python?").intent == "tutorial"
+    assert router.route("What's the weather today?").intent == "unrelated"
+
+
+def test_falls_through_when_unsure():
+    router = IntentRouter()
+    # Questions about the portfolio owner's own work belong to the model.
+    assert router.route("What's the best way to learn from your LangGraph projects?") is None
+    assert router.route("How did you fix the bug in your RAG project?") is None
+    # Ordinary portfolio questions, other languages and long messages.
+    assert router.route("What have you built with CrewAI?") is None
+    assert router.route("¿Estás disponible para trabajar?") is None
+    assert router.route("Tell me a joke " + "please " * 60) is None
+
+
+def test_messages_with_contact_details_fall_through():
+    router = IntentRouter()
+    assert router.route("Can I hire you? reach me at bob@x.io, we have a project") is None
+    assert router.route("Are you looking for work? I have a role at Acme, contact me at hr@acme.com") is None
+    assert router.route("Can you fix my code? email me at a@b.com") is None
+    assert router.route("Are you available for hire? Call +358 40 123 4567") is None
+    assert router.route("Oletko saatavilla töihin? Ota yhteyttä") is None
+
+
+def test_classifier_is_consulted_only_without_a_rule_match():
+    seen = []
+
+    def classifier(text):
+        seen.append(text)
+        return ("unrelated", 0.95) if "football" in text else ("unrelated", 0.5)
+
+    router = IntentRouter(classifier=classifier)
+    assert router.route("Who is the best football player ever?").intent == "unrelated"
+    assert router.route("Something vague") is None
+    assert router.route("Are you available for hire?").intent == "availability"
+    assert seen == ["Who is the best football player ever?", "Something vague"]
+
+
+def test_detect_language():
+    assert detect_language("Can you teach me Docker?") == "en"
+    assert detect_language("Miten opin ohjelmoimaan?") == "fi"
+    assert detect_language("Вы доступны для работы?") is None
+    # One Finnish greeting or a name with ä/ö/å does not make an English message Finnish.
+    assert detect_language("Hei! Are you available for hire?") == "en"
+    assert detect_language("Can Jörg hire you?") == "en"
+    assert detect_language("Are you open to work in Åbo?") == "en"
+    assert detect_language("Millainen sää on huomenna?") == "fi"
+    # Mixed signals go to the model.
+    assert detect_language("Hei, oletko available for hire?") is None
+
+
+def test_mixed_language_questions_get_the_right_reply_or_none():
+    router = IntentRouter()
+    assert router.route("Hei! Are you available for hire?").reply == CANNED_REPLIES["availability"]["en"]
+    assert router.route("Hei, oletko available for hire?") is None
+
+
+def test_chat_answers_routed_questions_without_a_model_call(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    agent = agent_logic.Me()
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content="From the model", tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    agent.api = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    assert agent.chat("Tell me a joke", []) == CANNED_REPLIES["unrelated"]["en"]
+    assert calls == []
+    assert agent.chat("What did you build at your last job?", []) == "From the model"
+    assert len(calls) == 1
+
+
+def test_lead_in_a_canned_question_reaches_the_model_and_is_queued(monkeypatch):
+    from local_stubs import FakeOpenAIServer
+
+    queued = []
+    monkeypatch.setattr(agent_logic, "NOTIFY_DIGEST_WINDOW", 0)
+    monkeypatch.setattr(agent_logic, "queue_email", lambda subject, body: queued.append(body))
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    script = [
+        {"tool_calls": [{"name": "record_user_details", "arguments": {"email": "bob@x.io", "name": "Bob"}}]},
+        {"reply": "Thanks Bob, I'll be in touch."},
+    ]
+    server = FakeOpenAIServer(script=script).start()
+    try:
+        monkeypatch.setattr(agent_logic, "OPENROUTER_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+        reply = agent_logic.Me().chat("Can I hire you? reach me at bob@x.io, we have a project", [])
+    finally:
+        server.stop()
+
+    assert reply == "Thanks Bob, I'll be in touch."
+    assert len(server.requests) == 2
+    assert len(queued) == 1 and "bob@x.io" in queued[0]
@@ -0,0 +1,48 @@
+"""
+Tests for request tracing and the Prometheus metrics registry.
+"""
+
+import json
+
+import pytest
+
+import agent_logic
+from metrics import Registry, span, trace
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, route="/chat")
+    registry.counter("demo_total", "Demo.").inc(2)
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{route="/chat",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/chat",le="1"} 3' in text
+    assert 'demo_seconds_bucket{route="/chat",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{route="/chat"} 4' in text
+    assert "# TYPE demo_total counter\ndemo_total 2" in text
+
+
+def test_span_records_outcome_and_trace():
+    hist = Registry().histogram("work_seconds", "Demo.", ("step", "outcome"))
+    with trace("request") as t:
+        with span(hist, "step", step="a"):
+            pass
+        with pytest.raises(ValueError):
+            with span(hist, "step", step="b"):
+                raise ValueError("boom")
+
+    assert hist.count(step="a", outcome="ok") == 1
+    assert hist.count(step="b", outcome="error") == 1
+    assert [(s["step"], s["outcome"]) for s in t.spans] == [("a", "ok"), ("b", "error")]
+
+
+def test_tool_spans_from_worker_threads_join_the_request_trace(monkeypatch):
+    monkeypatch.setitem(agent_logic.TOOLS, "echo", lambda text: {"text": text})
+    with trace("chat") as t:
+        results = agent_logic.run_tools([("echo", json.dumps({"text": "hi"})), ("missing", "{}")])
+
+    assert json.loads(results[0]) == {"text": "hi"}
+    assert [(s["tool"], s["outcome"]) for s in t.spans] == [("echo", "ok"), ("unknown", "error")]
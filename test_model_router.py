@@ -0,0 +1,105 @@
+"""
+Tests for the model fallback chain (hedging + circuit breakers) against a local fake OpenAI-compatible server.
+"""
+
+import asyncio
+import time
+
+import pytest
+from openai import AsyncOpenAI, OpenAI
+
+from local_stubs import FakeOpenAIServer
+from model_router import ModelRouter
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture
+def server():
+    server = FakeOpenAIServer().start()
+    yield server
+    server.stop()
+
+
+def _client(server):
+    return OpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+
+
+def _requests_for(server, model):
+    return sum(1 for r in server.requests if r["model"] == model)
+
+
+def test_slow_primary_is_hedged_and_fast_secondary_wins(server):
+    server.models = {"primary": {"latency": 1.0}, "secondary": {"latency": 0.05}}
+    router = ModelRouter(["primary", "secondary"], hedge_delay=0.1)
+
+    start = time.perf_counter()
+    res, model = router.create(_client(server).chat.completions.create, messages=MESSAGES, timeout=5)
+    elapsed = time.perf_counter() - start
+
+    assert model == "secondary"
+    assert res.choices[0].message.content == "reply from secondary"
+    assert elapsed < 0.6
+    assert router.stats()["secondary"]["hedges"] == 1
+
+
+def test_fast_primary_is_not_hedged(server):
+    router = ModelRouter(["primary", "secondary"], hedge_delay=0.5)
+    _, model = router.create(_client(server).chat.completions.create, messages=MESSAGES, timeout=5)
+
+    assert model == "primary"
+    assert _requests_for(server, "secondary") == 0
+
+
+def test_failing_primary_falls_back_and_opens_breaker(server):
+    server.models = {"primary": {"status": 500}}
+    router = ModelRouter(["primary", "secondary"], failure_threshold=2, reset_timeout=60)
+    call = _client(server).chat.completions.create
+
+    for _ in range(4):
+        _, model = router.create(call, messages=MESSAGES, timeout=5)
+        assert model == "secondary"
+
+    assert _requests_for(server, "primary") == 2
+    assert router.stats()["primary"]["breaker"] == "open"
+
+
+def test_breaker_half_opens_and_recovers(server):
+    server.models = {"primary": {"status": 500}}
+    router = ModelRouter(["primary", "secondary"], failure_threshold=1, reset_timeout=0.1)
+    call = _client(server).chat.completions.create
+
+    router.create(call, messages=MESSAGES, timeout=5)
+    assert router.breakers["primary"].state == "open"
+
+    server.models = {}
+    time.sleep(0.15)
+    _, model = router.create(call, messages=MESSAGES, timeout=5)
+    assert model == "primary"
+    assert router.breakers["primary"].state == "closed"
+
+
+def test_all_models_failing_raises(server):
+    server.default = {"status": 503}
+    router = ModelRouter(["primary", "secondary"])
+    with pytest.raises(Exception):
+        router.create(_client(server).chat.completions.create, messages=MESSAGES, timeout=5)
+
+
+def test_async_streams_are_hedged_and_loser_cancelled(server):
+    server.models = {"primary": {"latency": 1.0}, "secondary": {"latency": 0.05, "reply": "fast streamed reply"}}
+    router = ModelRouter(["primary", "secondary"], hedge_delay=0.1)
+    client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+
+    async def run():
+        stream, model = await router.acreate(client.chat.completions.create, messages=MESSAGES, stream=True, timeout=5)
+        text = "".join([chunk.choices[0].delta.content or "" async for chunk in stream])
+        return model, text
+
+    start = time.perf_counter()
+    model, text = asyncio.run(run())
+
+    assert (model, text) == ("secondary", "fast streamed reply")
+    assert time.perf_counter() - start < 0.6
+    # The cancelled primary call is neither a success nor a failure.
+    assert router.stats()["primary"]["failures"] == 0
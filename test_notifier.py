@@ -0,0 +1,112 @@
+"""
+Tests for the pooled email notifier against local stub HTTP and SMTP servers.
+"""
+
+import time
+
+import pytest
+import requests
+
+from local_stubs import StubEmailAPI, StubSMTPServer
+from notifier import Notifier
+
+SENDS = 5
+CONNECT_DELAY = 0.03
+
+
+@pytest.fixture
+def email_env(monkeypatch):
+    for key in ["RESEND_API_KEY", "SENDGRID_API_KEY", "SENDGRID_VERIFIED_SENDER", "SMTP_EMAIL", "SMTP_PASSWORD"]:
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("RECIPIENT_EMAIL", "me@example.com")
+    return monkeypatch
+
+
+def test_resend_reuses_one_connection_and_beats_fresh_posts(email_env):
+    email_env.setenv("RESEND_API_KEY", "key")
+    server = StubEmailAPI(connect_delay=CONNECT_DELAY, status_code=200).start()
+    notifier = Notifier(resend_url=server.url)
+    try:
+        start = time.perf_counter()
+        for i in range(SENDS):
+            requests.post(server.url, json={"n": i}, timeout=10).raise_for_status()
+        fresh = time.perf_counter() - start
+        fresh_connections = server.connections
+
+        start = time.perf_counter()
+        assert all(notifier.send(f"subject {i}", "body") for i in range(SENDS))
+        pooled = time.perf_counter() - start
+    finally:
+        notifier.close()
+        server.stop()
+
+    print(f"\nResend x{SENDS}: fresh {fresh * 1000:.1f} ms, pooled {pooled * 1000:.1f} ms")
+    assert fresh_connections == SENDS
+    assert server.connections - fresh_connections == 1
+    assert pooled < fresh
+
+
+def test_sendgrid_is_used_when_resend_fails(email_env):
+    email_env.setenv("RESEND_API_KEY", "key")
+    email_env.setenv("SENDGRID_API_KEY", "key")
+    resend = StubEmailAPI(status_code=500).start()
+    sendgrid = StubEmailAPI(status_code=202).start()
+    notifier = Notifier(resend_url=resend.url, sendgrid_url=sendgrid.url)
+    try:
+        assert notifier.send("subject", "body")
+    finally:
+        notifier.close()
+        resend.stop()
+        sendgrid.stop()
+
+    assert len(resend.requests) == 1
+    assert sendgrid.requests[0]["json"]["subject"] == "subject"
+
+
+def _smtp_notifier(server: StubSMTPServer, **kwargs) -> Notifier:
+    return Notifier(smtp_host="127.0.0.1", smtp_port=server.port, smtp_ssl=False, **kwargs)
+
+
+def test_smtp_keeps_one_authenticated_session(email_env):
+    email_env.setenv("SMTP_EMAIL", "bot@example.com")
+    email_env.setenv("SMTP_PASSWORD", "secret")
+    server = StubSMTPServer(connect_delay=CONNECT_DELAY).start()
+    try:
+        fresh = _smtp_notifier(server, smtp_idle_timeout=0)
+        start = time.perf_counter()
+        for i in range(SENDS):
+            assert fresh.send(f"subject {i}", "body")
+        fresh_time = time.perf_counter() - start
+        fresh.close()
+        fresh_logins = server.logins
+
+        pooled = _smtp_notifier(server)
+        start = time.perf_counter()
+        for i in range(SENDS):
+            assert pooled.send(f"subject {i}", "body")
+        pooled_time = time.perf_counter() - start
+        pooled.close()
+    finally:
+        server.stop()
+
+    print(f"\nSMTP x{SENDS}: fresh {fresh_time * 1000:.1f} ms, pooled {pooled_time * 1000:.1f} ms")
+    assert fresh_logins == SENDS
+    assert server.logins - fresh_logins == 1
+    assert len(server.requests) == 2 * SENDS
+    assert pooled_time < fresh_time
+
+
+def test_smtp_reconnects_after_server_drops_connection(email_env):
+    email_env.setenv("SMTP_EMAIL", "bot@example.com")
+    email_env.setenv("SMTP_PASSWORD", "secret")
+    server = StubSMTPServer(drop_after_message=True).start()
+    notifier = _smtp_notifier(server)
+    try:
+        assert notifier.send("first", "body")
+        assert notifier.send("second", "body")
+    finally:
+        notifier.close()
+        server.stop()
+
+    assert server.logins == 2
+    assert len(server.requests) == 2
@@ -0,0 +1,118 @@
+"""
+Tests for the durable email outbox and its background delivery worker.
+"""
+
+import threading
+import time
+
+from outbox import Outbox, OutboxWorker
+
+
+def test_enqueue_survives_reopen(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    Outbox(path).enqueue("subject", "body")
+
+    reopened = Outbox(path)
+    assert reopened.status()["pending"] == 1
+    assert [row[1:3] for row in reopened.due()] == [("subject", "body")]
+
+
+def test_failed_delivery_is_retried_with_backoff(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    outbox.enqueue("subject", "body")
+    results = iter([False, True])
+    worker = OutboxWorker(outbox, lambda subject, body: next(results))
+
+    assert worker.drain_once() == 0
+    assert outbox.status()["pending"] == 1
+    # The retry is scheduled in the future, so an immediate drain does nothing.
+    assert outbox.due() == []
+    assert outbox.next_due_in() > 0
+
+
+def test_worker_delivers_in_background(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    sent = []
+    worker = OutboxWorker(outbox, lambda subject, body: sent.append(subject) or True)
+    worker.start()
+    try:
+        outbox.enqueue("lead", "body")
+        worker.wake()
+        deadline = time.time() + 5
+        while not sent and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+
+    assert sent == ["lead"]
+    status = outbox.status()
+    assert status["pending"] == 0 and status["sent"] == 1
+    assert status["avg_delivery_latency_s"] is not None
+
+
+def test_workers_sharing_a_file_send_each_notification_once(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    for i in range(20):
+        Outbox(path).enqueue(f"lead {i}", "body")
+    sent, lock = [], threading.Lock()
+
+    def send(subject, body):
+        time.sleep(0.005)
+        with lock:
+            sent.append(subject)
+        return True
+
+    workers = [OutboxWorker(Outbox(path), send) for _ in range(3)]
+    threads = [threading.Thread(target=lambda w=w: [w.drain_once() for _ in range(3)]) for w in workers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(sent) == sorted(f"lead {i}" for i in range(20))
+    assert Outbox(path).status()["sent"] == 20
+
+
+def test_expired_claim_is_picked_up_again(tmp_path):
+    path = tmp_path / "outbox.sqlite3"
+    Outbox(path).enqueue("subject", "body")
+
+    # The first worker claims the row and dies before marking it.
+    assert len(Outbox(path).due(lease=0.05)) == 1
+    other = Outbox(path)
+    assert other.due() == []
+    assert other.status()["pending"] == 1
+    time.sleep(0.06)
+    assert [row[1] for row in other.due()] == ["subject"]
+
+
+def test_digest_deduplicates_and_flushes_as_one_email(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    outbox.add_to_digest("question", "what is your salary", "❓ Unknown Question", "Question: salary?")
+    outbox.add_to_digest("question", "what is your salary", "❓ Unknown Question", "Question: Salary??")
+    assert outbox.add_to_digest("lead", "a@example.com", "🎯 Lead: A", "Email: a@example.com") == 2
+
+    email_id = outbox.flush_digest()
+    assert email_id is not None and outbox.flush_digest() is None
+    [(_, subject, body, _)] = outbox.due()
+    assert subject == "📬 Portfolio AI digest: 1 question, 1 lead"
+    assert "❓ Unknown Question (x2)\nQuestion: Salary??" in body
+    assert outbox.status()["digest_pending"] == 0
+
+
+def test_worker_flushes_digest_after_window_or_size(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.sqlite3")
+    sent = []
+    worker = OutboxWorker(outbox, lambda subject, body: sent.append(subject) or True, digest_window=0.2, digest_max_items=3)
+
+    outbox.add_to_digest("question", "q1", "Q1", "body")
+    assert 0 < worker.flush_digest_if_due() <= 0.2
+    outbox.add_to_digest("question", "q2", "Q2", "body")
+    outbox.add_to_digest("question", "q3", "Q3", "body")
+    assert worker.flush_digest_if_due() is None  # size limit reached
+
+    outbox.add_to_digest("question", "q4", "Q4", "body")
+    time.sleep(0.25)
+    worker.flush_digest_if_due()  # window elapsed
+    assert worker.drain_once() == 2
+    assert sent == ["📬 Portfolio AI digest: 3 questions", "📬 Portfolio AI digest: 1 question"]
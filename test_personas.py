@@ -0,0 +1,108 @@
+"""
+Tests for the persona registry, per-persona agents and persona routing in the API.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+import agent_logic
+import api
+from personas import PersonaRegistry, UnknownPersona
+
+
+def _personas(tmp_path, *names):
+    for name in names:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "summary.txt").write_text(f"I am {name}.", encoding="utf-8")
+        (tmp_path / name / "prompt.tmpl").write_text(f"You are {name}.\n$bio", encoding="utf-8")
+    return tmp_path
+
+
+def test_loads_lazily_once_and_evicts_least_recently_used(tmp_path):
+    root = _personas(tmp_path, "ada", "alan", "grace")
+    built = []
+    lock = threading.Lock()
+
+    def factory(persona_id, directory):
+        time.sleep(0.05)
+        with lock:
+            built.append(persona_id)
+        return {"id": persona_id, "dir": directory}
+
+    registry = PersonaRegistry(root, factory, max_loaded=2)
+    assert registry.stats()["loaded"] == []
+
+    with ThreadPoolExecutor(4) as pool:
+        agents = list(pool.map(lambda _: registry.get("ada"), range(4)))
+    assert built == ["ada"]
+    assert all(a is agents[0] for a in agents)
+    assert agents[0]["dir"] == root / "ada"
+
+    registry.get("alan")
+    registry.get("ada")
+    registry.get("grace")
+    stats = registry.stats()
+    assert stats["loaded"] == ["ada", "grace"]
+    assert (stats["loads"], stats["evictions"]) == (3, 1)
+    assert stats["available"] == ["ada", "alan", "grace"]
+
+
+def test_unknown_or_unsafe_persona_ids_are_rejected(tmp_path):
+    registry = PersonaRegistry(_personas(tmp_path, "ada"), lambda *_: object())
+    for persona_id in ("bob", "../ada", "Ada", ""):
+        with pytest.raises(UnknownPersona):
+            registry.get(persona_id)
+
+
+def test_directory_without_a_prompt_template_is_not_a_persona(tmp_path):
+    root = _personas(tmp_path, "ada", "alan")
+    (root / "alan" / "prompt.tmpl").unlink()
+    registry = PersonaRegistry(root, lambda *_: object())
+
+    with pytest.raises(UnknownPersona):
+        registry.get("alan")
+    assert registry.available() == ["ada"]
+
+
+def test_persona_agent_uses_its_own_context_and_template(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    monkeypatch.setattr(agent_logic, "RETRIEVAL_INDEX_PATH", tmp_path / "index.json")
+    directory = _personas(tmp_path, "ada") / "ada"
+    (directory / "notes.txt").write_text("I wrote the first program.", encoding="utf-8")
+    (directory / "prompt.tmpl").write_text("You are Ada Lovelace.\n$bio", encoding="utf-8")
+
+    agent = agent_logic.Me(context_dir=directory, persona="ada")
+    default = agent_logic.Me()
+
+    assert agent.system_prompt == "You are Ada Lovelace.\nI am ada.\n\nI wrote the first program."
+    assert agent.intents is None and default.intents is not None
+    assert agent.index.path == tmp_path / "index-ada.json"
+    # All personas share one upstream client pool and model router.
+    assert agent.api is default.api and agent.router is default.router
+
+
+def test_chat_routes_by_path_or_header(tmp_path, monkeypatch):
+    class Persona:
+        def __init__(self, name):
+            self.name = name
+
+        def chat(self, msg, history):
+            return f"{self.name}: {msg}"
+
+    registry = PersonaRegistry(_personas(tmp_path, "ada"), lambda persona_id, _: Persona(persona_id))
+    monkeypatch.setattr(api, "PERSONAS", registry)
+    monkeypatch.setattr(api, "my_agent", Persona("default"))
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    api._agent_ready.set()
+    client = TestClient(api.app)
+
+    assert client.post("/chat", json={"message": "hi"}).json()["reply"] == "default: hi"
+    assert client.post("/personas/ada/chat", json={"message": "hi"}).json()["reply"] == "ada: hi"
+    assert client.post("/chat", json={"message": "hi"}, headers={"X-Persona": "ada"}).json()["reply"] == "ada: hi"
+    assert client.post("/personas/bob/chat", json={"message": "hi"}).status_code == 404
+    assert client.get("/health/personas").json()["loaded"] == ["ada"]
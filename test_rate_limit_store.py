@@ -0,0 +1,65 @@
+"""
+Tests for the shared SQLite rate-limit storage.
+"""
+
+import multiprocessing
+import time
+
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from rate_limit_store import SQLiteStorage
+
+
+def _uri(tmp_path):
+    return f"sqlite:///{(tmp_path / 'ratelimit.sqlite3').as_posix()}"
+
+
+def test_uri_selects_sqlite_storage(tmp_path):
+    storage = storage_from_string(_uri(tmp_path))
+    assert isinstance(storage, SQLiteStorage)
+    assert storage.path == tmp_path / "ratelimit.sqlite3"
+    assert storage.check()
+
+
+def test_incr_counts_and_window_resets(tmp_path):
+    storage = SQLiteStorage(_uri(tmp_path))
+    assert storage.incr("k", expiry=1) == 1
+    assert storage.incr("k", expiry=1) == 2
+    assert storage.get("k") == 2
+    assert storage.get_expiry("k") > time.time()
+
+    time.sleep(1.05)
+    assert storage.get("k") == 0
+    assert storage.incr("k", expiry=1) == 1
+
+
+def test_clear_and_reset(tmp_path):
+    storage = SQLiteStorage(_uri(tmp_path))
+    storage.incr("a", expiry=60)
+    storage.incr("b", expiry=60)
+    storage.clear("a")
+    assert storage.get("a") == 0
+    assert storage.reset() == 1
+    assert storage.get("b") == 0
+
+
+def _hit_many(uri, limit, hits, queue):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerMinute(limit)
+    queue.put(sum(limiter.hit(item, "client") for _ in range(hits)))
+
+
+def test_limit_is_exact_across_processes(tmp_path):
+    uri, limit = _uri(tmp_path), 25
+    SQLiteStorage(uri)  # create the table before the workers race for it
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_hit_many, args=(uri, limit, 40, queue)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    admitted = sum(queue.get(timeout=30) for _ in procs)
+    for p in procs:
+        p.join()
+
+    assert admitted == limit
@@ -0,0 +1,85 @@
+"""
+Tests for the chat response cache and its use in Me.chat.
+"""
+
+import time
+from types import SimpleNamespace
+
+import agent_logic
+from response_cache import ResponseCache
+
+
+def test_key_ignores_case_whitespace_and_trailing_punctuation():
+    cache = ResponseCache()
+    assert cache.key("Are you  available for hire?", [], "prompt") == cache.key("are you available for hire", [], "prompt")
+    assert cache.key("hi", [], "prompt") != cache.key("hi", [], "other prompt")
+    assert cache.key("hi", [{"role": "user", "content": "a"}], "prompt") != cache.key("hi", [], "prompt")
+
+
+def test_lru_eviction_respects_byte_cap():
+    cache = ResponseCache(max_bytes=350)
+    for name in "abc":
+        cache.put(cache.key(name, [], "p"), "x" * 50)
+    cache.get(cache.key("a", [], "p"))
+    cache.put(cache.key("d", [], "p"), "x" * 50)
+
+    assert cache.get(cache.key("a", [], "p")) is not None
+    assert cache.get(cache.key("b", [], "p")) is None
+    assert cache.stats()["bytes"] <= 350
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0.01)
+    cache.put("k", "reply")
+    time.sleep(0.02)
+    assert cache.get("k") is None
+
+
+def test_persists_across_restarts(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    ResponseCache(path=path).put("k", "reply")
+    assert ResponseCache(path=path).get("k") == "reply"
+
+
+def _completion(content=None, tool_calls=None):
+    message = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _agent(monkeypatch, responses):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setenv("RESPONSE_CACHE_PATH", "")
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    agent = agent_logic.Me()
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return responses.pop(0)
+
+    agent.api = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return agent, calls
+
+
+def test_chat_serves_repeat_questions_from_cache(monkeypatch):
+    agent, calls = _agent(monkeypatch, [_completion("I build agentic AI systems.")])
+
+    assert agent.chat("What's your background?", []) == "I build agentic AI systems."
+    assert agent.chat("what's your  background", []) == "I build agentic AI systems."
+    assert len(calls) == 1
+    assert agent.cache.stats()["hits"] == 1
+
+
+def test_chat_never_caches_tool_turns(monkeypatch):
+    tool_call = SimpleNamespace(
+        id="call_1", function=SimpleNamespace(name="unknown_tool", arguments="{}")
+    )
+    agent, calls = _agent(
+        monkeypatch,
+        [_completion(tool_calls=[tool_call]), _completion("Thanks!"), _completion("Thanks again!")],
+    )
+
+    assert agent.chat("my email is a@b.c", []) == "Thanks!"
+    assert agent.chat("my email is a@b.c", []) == "Thanks again!"
+    assert len(calls) == 3
@@ -0,0 +1,47 @@
+"""
+Tests for the offline BM25 retrieval index over the me/ context files.
+"""
+
+import os
+
+from retrieval import RetrievalIndex, chunk_text
+
+
+def _write_context(directory):
+    directory.mkdir()
+    (directory / "summary.txt").write_text(
+        "# Who I Am\n\nI'm an AI Engineer.\n\n### Current Status\nI am available for hire in Finland.\n", encoding="utf-8"
+    )
+    (directory / "portfolio.txt").write_text(
+        "## Projects\n\n### Sidekick\nA LangGraph assistant with a self-correction loop.\n", encoding="utf-8"
+    )
+
+
+def test_chunks_carry_source_and_heading():
+    chunks = chunk_text("# Title\n\nIntro.\n\n## Skills\nPython and LangGraph.", "summary.txt")
+    assert chunks == ["[summary.txt / Title]\nIntro.", "[summary.txt / Skills]\nPython and LangGraph."]
+
+
+def test_search_ranks_relevant_chunk(tmp_path):
+    _write_context(tmp_path / "me")
+    index = RetrievalIndex(tmp_path / "me")
+
+    assert index.search("Are you available for hire?", k=1) == ["[summary.txt / Current Status]\nI am available for hire in Finland."]
+    assert "Sidekick" in index.search("tell me about sidekick", k=1)[0]
+    assert index.search("zzz", k=1) == []
+
+
+def test_refresh_only_reindexes_changed_files(tmp_path):
+    source = tmp_path / "me"
+    _write_context(source)
+    index_path = tmp_path / "index.json"
+    RetrievalIndex(source, index_path)
+
+    reloaded = RetrievalIndex(source, index_path)
+    assert reloaded.refresh() == []
+
+    portfolio = source / "portfolio.txt"
+    portfolio.write_text(portfolio.read_text(encoding="utf-8") + "\n### Crew\nA CrewAI engineering team.\n", encoding="utf-8")
+    os.utime(portfolio, ns=(1, 1))
+    assert reloaded.refresh() == ["portfolio.txt"]
+    assert "CrewAI" in reloaded.search("crewai team", k=1)[0]
@@ -0,0 +1,86 @@
+"""
+Tests for server-side conversation sessions.
+"""
+
+import time
+
+from fastapi.testclient import TestClient
+
+import api
+from sessions import SessionStore
+
+TURN = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+
+
+def test_append_and_trim_to_max_messages():
+    store = SessionStore(max_messages=3)
+    store.append("s", TURN)
+    store.append("s", TURN)
+    assert store.get("s") == TURN[1:] + TURN
+    assert store.get("missing") is None
+
+
+def test_idle_sessions_expire_and_lru_is_evicted_by_size():
+    store = SessionStore(idle_ttl=0.1)
+    store.append("old", TURN)
+    time.sleep(0.15)
+    assert store.get("old") is None
+    assert store.stats()["expirations"] == 1
+
+    store = SessionStore(max_bytes=80)
+    for sid in ("a", "b", "c", "d"):
+        store.append(sid, [{"role": "user", "content": f"message {sid} " * 5}])
+        store.get("a")  # keep "a" recently used
+    assert store.get("a") is not None
+    assert store.get("b") is None
+    assert store.stats()["evictions"] >= 1
+
+
+def test_sessions_survive_reopen(tmp_path):
+    SessionStore(path=tmp_path / "sessions.sqlite3").append("s", TURN)
+    assert SessionStore(path=tmp_path / "sessions.sqlite3").get("s") == TURN
+
+
+
+def test_workers_sharing_a_file_see_each_others_turns(tmp_path):
+    path = tmp_path / "sessions.sqlite3"
+    a, b = SessionStore(path=path), SessionStore(path=path, max_bytes=1)
+    a.append("s", TURN)
+    b.get("missing")  # b has loaded the file before "t" exists
+    a.append("t", TURN)
+
+    assert b.get("t") == TURN
+    b.append("s", TURN)
+    assert a.get("s") == TURN + TURN
+    # Evicting b's in-memory copies (max_bytes=1) must not delete the shared rows.
+    b.append("u", TURN)
+    assert a.get("t") == TURN
+    b.delete("s")
+    assert a.get("s") is None
+
+class EchoAgent:
+    def __init__(self):
+        self.histories = []
+
+    def chat(self, msg, history):
+        self.histories.append(history)
+        return f"echo: {msg}"
+
+
+def test_chat_endpoint_session_mode(monkeypatch):
+    agent = EchoAgent()
+    monkeypatch.setattr(api, "my_agent", agent)
+    monkeypatch.setattr(api, "SESSIONS", SessionStore())
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    api._agent_ready.set()
+    client = TestClient(api.app)
+
+    first = client.post("/chat", json={"message": "one", "session_id": "new"}).json()
+    session_id = first["session_id"]
+    assert session_id != "new"
+    second = client.post("/chat", json={"message": "two", "session_id": session_id}).json()
+
+    assert second == {"reply": "echo: two", "session_id": session_id}
+    assert agent.histories[1] == [{"role": "user", "content": "one"}, {"role": "assistant", "content": "echo: one"}]
+    # Stateless mode is unchanged.
+    assert client.post("/chat", json={"message": "three", "history": []}).json() == {"reply": "echo: three"}
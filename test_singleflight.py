@@ -0,0 +1,95 @@
+"""
+Tests for single-flight coalescing of identical in-flight chat requests.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import agent_logic
+from local_stubs import FakeOpenAIServer
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights, calls = SingleFlight(), []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return "answer"
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: flights.do("k", work), range(8)))
+
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["answer"] * 8
+    assert sum(shared for _, shared in results) == 7
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 7}
+
+
+def test_errors_reach_followers_and_are_not_remembered():
+    flights, started = SingleFlight(), threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flights.do, "k", fail)
+        started.wait()
+        follower = pool.submit(flights.do, "k", fail)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+    assert flights.do("k", lambda: "recovered") == ("recovered", False)
+
+
+def test_streams_are_broadcast_to_late_joiners():
+    flights, runs = SingleFlight(), []
+
+    async def produce():
+        runs.append(1)
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.05)
+            yield token
+
+    async def consume(delay):
+        await asyncio.sleep(delay)
+        tokens, shared = flights.stream("k", produce)
+        return "".join([t async for t in tokens]), shared
+
+    async def run():
+        return await asyncio.gather(consume(0), consume(0.01), consume(0.08))
+
+    assert asyncio.run(run()) == [("abc", False), ("abc", True), ("abc", True)]
+    assert len(runs) == 1
+
+
+def test_identical_chat_burst_makes_one_upstream_call(monkeypatch):
+    leads = []
+    monkeypatch.setitem(agent_logic.TOOLS, "record_user_details", lambda **kw: leads.append(kw) or {"status": "ok"})
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    script = [
+        {"tool_calls": [{"name": "record_user_details", "arguments": {"email": "a@example.com"}}]},
+        {"reply": "Thanks, talk soon."},
+    ]
+    server = FakeOpenAIServer(latency=0.2, script=script).start()
+    try:
+        monkeypatch.setattr(agent_logic, "OPENROUTER_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+        agent = agent_logic.Me()
+        with ThreadPoolExecutor(5) as pool:
+            replies = list(pool.map(lambda _: agent.chat("My email is a@example.com", []), range(5)))
+    finally:
+        server.stop()
+
+    assert replies == ["Thanks, talk soon."] * 5
+    assert len(server.requests) == 2  # one tool round plus one answer, not ten
+    assert len(leads) == 1
+    assert agent.flights.stats()["coalesced"] == 4
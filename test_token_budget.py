@@ -0,0 +1,160 @@
+"""
+Tests for rolling token budgets and their enforcement in Me.chat.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from limits import RateLimitItemPerMinute
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+import agent_logic
+import api
+from rate_limit_store import SQLiteStorage
+from token_budget import BudgetExceeded, TokenBudget, billing
+
+
+def test_sqlite_storage_supports_sliding_window_counters(tmp_path):
+    storage = SQLiteStorage(f"sqlite:///{(tmp_path / 'budget.sqlite3').as_posix()}")
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = RateLimitItemPerMinute(100)
+
+    assert limiter.hit(item, "a", cost=60)
+    assert not limiter.hit(item, "a", cost=50)
+    assert limiter.test(item, "a", cost=40)
+    assert limiter.get_window_stats(item, "a").remaining == 40
+    assert limiter.get_window_stats(item, "b").remaining == 100
+    limiter.clear(item, "a")
+    assert limiter.get_window_stats(item, "a").remaining == 100
+
+
+def test_budgets_are_per_client_plus_global(tmp_path):
+    budget = TokenBudget(
+        f"sqlite:///{(tmp_path / 'budget.sqlite3').as_posix()}", per_client="100/minute", overall="150/minute"
+    )
+    budget.charge("1.1.1.1", 80)
+    assert budget.remaining("1.1.1.1")[:2] == (20, "client")
+    assert budget.remaining("2.2.2.2")[:2] == (70, "global")
+
+    # Usage is charged even past the limit; the next request then sees nothing left.
+    budget.charge("2.2.2.2", 75)
+    left, scope, retry_after = budget.remaining("2.2.2.2")
+    assert (left, scope) == (0, "global")
+    assert 1 <= retry_after <= 120
+    assert not TokenBudget("memory://").enabled
+
+
+def _agent(monkeypatch, budget, responses):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    monkeypatch.setattr(agent_logic, "TOKEN_BUDGET", budget)
+    agent = agent_logic.Me()
+    agent.intents = None
+    monkeypatch.setattr(agent, "prompt_for", lambda msg, history: "You are Sami.")
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=responses.pop(0), tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=SimpleNamespace(prompt_tokens=190, completion_tokens=10))
+
+    agent.api = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return agent, calls
+
+
+def test_chat_trims_history_then_rejects_once_the_budget_is_spent(monkeypatch):
+    budget = TokenBudget("memory://", per_client="200/minute")
+    agent, calls = _agent(monkeypatch, budget, ["First", "Second"])
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"Earlier message number {i} " * 5} for i in range(12)]
+
+    with billing("9.9.9.9"):
+        assert agent.chat("What do you build?", history) == "First"
+    sent = calls[0]["messages"]
+    assert 1 < len(sent) < len(history) + 2
+    assert sent[-1]["content"] == "What do you build?"
+    assert budget.remaining("9.9.9.9")[0] == 0
+
+    with billing("9.9.9.9"), pytest.raises(BudgetExceeded) as excinfo:
+        agent.chat("And what else?", history)
+    assert excinfo.value.scope == "client"
+    assert len(calls) == 1
+
+    # Another visitor has their own budget.
+    with billing("8.8.8.8"):
+        assert agent.chat("And what else?", []) == "Second"
+
+
+
+def test_each_caller_is_checked_against_its_own_budget_before_coalescing(monkeypatch):
+    budget = TokenBudget("memory://", per_client="1000/minute")
+    budget.charge("7.7.7.7", 1000)
+    agent, calls = _agent(monkeypatch, budget, ["Shared"])
+    create, release = agent.api.chat.completions.create, threading.Event()
+
+    def slow_create(**kwargs):
+        release.wait(5)
+        return create(**kwargs)
+
+    agent.api = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=slow_create)))
+
+    def ask(client):
+        with billing(client):
+            return agent.chat("What do you build?", [])
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(ask, "6.6.6.6")
+        time.sleep(0.05)
+        # A spent client is refused even while an identical request is in flight...
+        with pytest.raises(BudgetExceeded):
+            ask("7.7.7.7")
+        # ...and does not fail the flight for the clients that joined it.
+        follower = pool.submit(ask, "5.5.5.5")
+        time.sleep(0.05)
+        release.set()
+        assert leader.result() == follower.result() == "Shared"
+    assert len(calls) == 1
+    assert agent.flights.stats()["coalesced"] == 1
+
+
+def test_streamed_chat_checks_and_charges_budget_off_the_event_loop(monkeypatch):
+    from local_stubs import FakeOpenAIServer
+
+    budget = TokenBudget("memory://", per_client="100000/minute")
+    used = []
+    for name in ("remaining", "charge"):
+        method = getattr(budget, name)
+        monkeypatch.setattr(budget, name, lambda *args, _m=method, _n=name: used.append((_n, threading.current_thread())) or _m(*args))
+    server = FakeOpenAIServer(latency=0.0).start()
+    try:
+        monkeypatch.setattr(agent_logic, "OPENROUTER_BASE_URL", server.base_url)
+        agent, _ = _agent(monkeypatch, budget, [])
+
+        async def stream():
+            with billing("4.4.4.4"):
+                return "".join([token async for token in agent.achat("What do you build?", [])])
+
+        assert asyncio.run(stream())
+    finally:
+        server.stop()
+
+    assert {name for name, _ in used} == {"remaining", "charge"}
+    assert all(thread is not threading.main_thread() for _, thread in used)
+    assert budget.remaining("4.4.4.4")[0] < 100000
+
+def test_chat_endpoint_answers_429_with_retry_after(monkeypatch):
+    class SpentAgent:
+        def chat(self, msg, history):
+            raise BudgetExceeded("client", 42)
+
+    monkeypatch.setattr(api, "my_agent", SpentAgent())
+    monkeypatch.setattr(api.limiter, "enabled", False)
+    api._agent_ready.set()
+
+    response = TestClient(api.app).post("/chat", json={"message": "hi"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "42"
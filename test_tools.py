@@ -0,0 +1,77 @@
+"""
+Tests for concurrent tool execution within one assistant turn.
+"""
+
+import asyncio
+import json
+import time
+
+import agent_logic
+
+
+def _install_tools(monkeypatch):
+    def slow(label: str, delay: float):
+        time.sleep(delay)
+        return {"status": "ok", "label": label}
+
+    monkeypatch.setitem(agent_logic.TOOLS, "slow", slow)
+
+
+def _call(label: str, delay: float) -> tuple[str, str]:
+    return "slow", json.dumps({"label": label, "delay": delay})
+
+
+def test_tools_run_concurrently_and_keep_call_order(monkeypatch):
+    _install_tools(monkeypatch)
+    start = time.perf_counter()
+    results = agent_logic.run_tools([_call("first", 0.3), _call("second", 0.1), _call("third", 0.2)])
+    elapsed = time.perf_counter() - start
+
+    assert [json.loads(r)["label"] for r in results] == ["first", "second", "third"]
+    assert elapsed < 0.5
+
+
+def test_hung_tool_returns_error_result(monkeypatch):
+    _install_tools(monkeypatch)
+    results = agent_logic.run_tools([_call("hung", 1.0), _call("quick", 0.0)], timeout=0.2)
+
+    assert "timed out" in json.loads(results[0])["error"]
+    assert json.loads(results[1])["label"] == "quick"
+
+
+def test_async_tools_gather_in_order_with_timeout(monkeypatch):
+    _install_tools(monkeypatch)
+    calls = [_call("hung", 1.0), _call("quick", 0.05), ("missing_tool", "{}")]
+    results = asyncio.run(agent_logic.arun_tools(calls, timeout=0.2))
+
+    assert "timed out" in json.loads(results[0])["error"]
+    assert json.loads(results[1])["label"] == "quick"
+    assert json.loads(results[2]) == {"error": "Tool not found"}
+
+
+def test_scripted_tool_round_trip_against_fake_model(monkeypatch):
+    from local_stubs import FakeOpenAIServer
+
+    leads = []
+    monkeypatch.setitem(agent_logic.TOOLS, "record_user_details", lambda **kw: leads.append(kw) or {"status": "ok"})
+    monkeypatch.setattr(agent_logic, "RESPONSE_CACHE_PATH", "")
+    script = [
+        {"tool_calls": [{"name": "record_user_details", "arguments": {"email": "a@example.com"}}]},
+        {"reply": "Thanks, talk soon."},
+    ]
+    server = FakeOpenAIServer(script=script).start()
+    try:
+        monkeypatch.setattr(agent_logic, "OPENROUTER_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+        agent = agent_logic.Me()
+        assert agent.chat("Reach me at a@example.com", []) == "Thanks, talk soon."
+
+        async def stream():
+            return "".join([token async for token in agent.achat("Reach me at a@example.com please", [])])
+
+        assert asyncio.run(stream()) == "Thanks, talk soon."
+    finally:
+        server.stop()
+
+    assert leads == [{"email": "a@example.com"}, {"email": "a@example.com"}]
+    assert len(server.requests) == 4
@@ -0,0 +1,67 @@
+"""
+Tests for the shared upstream connection pool: warm-up reuse, traffic-gated pings and shutdown.
+"""
+
+import asyncio
+
+from openai import OpenAI
+
+import agent_logic
+from local_stubs import FakeOpenAIServer
+from upstream_pool import UpstreamPool
+
+
+def test_warm_up_opens_the_connection_the_first_request_reuses():
+    server = FakeOpenAIServer(latency=0.0).start()
+    pool = UpstreamPool(server.base_url, http2=False)
+    try:
+        assert pool.warm() is not None
+        client = OpenAI(api_key="test", base_url=server.base_url, http_client=pool.client)
+        for _ in range(3):
+            client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+        assert (server.pings, server.connections) == (1, 1)
+    finally:
+        pool.close()
+        server.stop()
+
+
+def test_failed_warm_up_returns_none():
+    pool = UpstreamPool("http://127.0.0.1:1/v1", http2=False, connect_timeout=0.5)
+    try:
+        assert pool.warm() is None
+        assert pool.pings == 0
+    finally:
+        pool.close()
+
+
+def test_keep_warm_pings_only_while_there_is_traffic():
+    server = FakeOpenAIServer(latency=0.0).start()
+    pool = UpstreamPool(server.base_url, http2=False, ping_interval=0.05, active_window=60.0)
+
+    async def run():
+        task = asyncio.create_task(pool.keep_warm())
+        await asyncio.sleep(0.3)
+        # No traffic yet: only the start-up warm-up of the sync and async pools.
+        idle = pool.pings
+        pool.touch()
+        await asyncio.sleep(0.3)
+        task.cancel()
+        return idle, pool.pings
+
+    try:
+        idle, busy = asyncio.run(run())
+        assert idle == 2
+        assert busy > 4
+    finally:
+        pool.close()
+        server.stop()
+
+
+def test_close_upstream_closes_the_shared_pool(monkeypatch):
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    pool = agent_logic.upstream()[3]
+    asyncio.run(agent_logic.close_upstream())
+
+    assert pool.client.is_closed and pool.async_client.is_closed
+    # An agent built after shutdown (e.g. in a restarted app) gets a fresh pool.
+    assert agent_logic.upstream()[3] is not pool
@@ -0,0 +1,87 @@
+import contextvars
+import math
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from limits import RateLimitItem, parse_many
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+from rate_limit_store import SQLiteStorage  # noqa: F401  (registers the sqlite:// storage)
+
+# The client (IP) whose budget the current request spends; set by the API around a chat call.
+_current_client: contextvars.ContextVar[str | None] = contextvars.ContextVar("budget_client", default=None)
+
+
+class BudgetExceeded(Exception):
+    """Not enough tokens left in a budget for even the smallest prompt; retry after `retry_after` seconds."""
+
+    def __init__(self, scope: str, retry_after: int):
+        super().__init__(f"Token budget exhausted ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+@contextmanager
+def billing(client: str | None) -> Iterator[None]:
+    """Charges completions made inside the block to `client`'s budget."""
+    token = _current_client.set(client)
+    try:
+        yield
+    finally:
+        try:
+            _current_client.reset(token)
+        except ValueError:
+            # Streaming generators may be finalized in another context.
+            pass
+
+
+def current_client() -> str | None:
+    return _current_client.get()
+
+
+class TokenBudget:
+    """Rolling-window token budgets per client and for the whole service.
+
+    Limits use the rate-limit string syntax, e.g. "20000/minute;150000/day", and are tracked
+    as sliding-window counters in a `limits` storage (the shared SQLite file by default), so
+    every worker sees the same spend. Usage is charged after each completion from what the
+    model API reports; `remaining` is checked before the next upstream call.
+    """
+
+    def __init__(self, storage_uri: str, per_client: str = "", overall: str = ""):
+        self.per_client: list[RateLimitItem] = parse_many(per_client) if per_client else []
+        self.overall: list[RateLimitItem] = parse_many(overall) if overall else []
+        self.storage = storage_from_string(storage_uri) if self.enabled else None
+        self.limiter = SlidingWindowCounterRateLimiter(self.storage) if self.storage else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.per_client or self.overall)
+
+    def _limits(self, client: str | None) -> Iterator[tuple[str, RateLimitItem, tuple[str, ...]]]:
+        if client is not None:
+            for item in self.per_client:
+                yield "client", item, ("tokens", "client", client)
+        for item in self.overall:
+            yield "global", item, ("tokens", "global")
+
+    def remaining(self, client: str | None) -> tuple[int, str | None, int]:
+        """(tokens left in the tightest budget, its scope, seconds until it frees up)."""
+        if not self.enabled:
+            return sys.maxsize, None, 0
+        left, scope, reset_at = sys.maxsize, None, time.time()
+        for name, item, identifiers in self._limits(client):
+            stats = self.limiter.get_window_stats(item, *identifiers)
+            if stats.remaining < left:
+                left, scope, reset_at = stats.remaining, name, stats.reset_time
+        return left, scope, max(1, math.ceil(reset_at - time.time()))
+
+    def charge(self, client: str | None, tokens: int) -> None:
+        """Adds spent tokens to every budget of `client` and the global one, even past the limit."""
+        if not self.enabled or tokens <= 0:
+            return
+        for _, item, identifiers in self._limits(client):
+            self.storage.acquire_sliding_window_entry(item.key_for(*identifiers), sys.maxsize, item.get_expiry(), tokens)
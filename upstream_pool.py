@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class UpstreamPool:
+    """Tuned httpx clients shared by every OpenAI client, kept warm while the service has traffic.
+
+    Idle connections are kept for `keepalive_expiry` seconds instead of httpx's 5, HTTP/2 is
+    used when the `h2` package is installed (one multiplexed TLS connection instead of one
+    per concurrent request), and `keep_warm()` sends a HEAD to the base URL every
+    `ping_interval` seconds as long as there was a chat within the last `active_window`
+    seconds, so the first visitor after a quiet spell does not pay DNS + TCP + TLS setup.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 120.0,
+        http2: bool = True,
+        ping_interval: float = 50.0,
+        active_window: float = 900.0,
+        connect_timeout: float = 5.0,
+    ):
+        self.base_url = base_url
+        self.http2 = http2 and http2_available()
+        if http2 and not self.http2:
+            print("h2 not installed, upstream connections use HTTP/1.1")
+        self.ping_interval = ping_interval
+        self.active_window = active_window
+        options = {
+            "http2": self.http2,
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            # Per-call read timeouts are set by the caller; only the connect phase is bounded here.
+            "timeout": httpx.Timeout(60.0, connect=connect_timeout),
+        }
+        self.client = httpx.Client(**options)
+        self.async_client = httpx.AsyncClient(**options)
+        self.last_activity = 0.0
+        self.pings = 0
+
+    def touch(self) -> None:
+        """Marks traffic, which keeps the pings going for another `active_window` seconds."""
+        self.last_activity = time.monotonic()
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() - self.last_activity < self.active_window
+
+    def warm(self) -> float | None:
+        """Opens (or refreshes) a pooled connection of the sync client; returns seconds, None on failure."""
+        start = time.perf_counter()
+        try:
+            self.client.head(self.base_url)
+        except httpx.HTTPError as e:
+            print(f"Upstream warm-up failed: {type(e).__name__}")
+            return None
+        self.pings += 1
+        return time.perf_counter() - start
+
+    async def awarm(self) -> float | None:
+        """Async twin of `warm` for the streaming client; must run on the serving event loop."""
+        start = time.perf_counter()
+        try:
+            await self.async_client.head(self.base_url)
+        except httpx.HTTPError as e:
+            print(f"Upstream warm-up failed: {type(e).__name__}")
+            return None
+        self.pings += 1
+        return time.perf_counter() - start
+
+    async def _ping(self) -> None:
+        # The sync ping runs on a daemon thread so shutdown never waits for a slow connect.
+        threading.Thread(target=self.warm, name="upstream-warm", daemon=True).start()
+        await self.awarm()
+
+    async def keep_warm(self) -> None:
+        """Warms both pools now, then pings while there is traffic. Run as a task; cancel to stop."""
+        await self._ping()
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if self.active:
+                await self._ping()
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        await self.async_client.aclose()